@@ -1,12 +1,22 @@
-import requests
 import json
 import time
 import argparse
 import csv
 import os
+import sys
 from datetime import datetime
 from collections import defaultdict
+import numpy as np
 import matplotlib.pyplot as plt
+from dpid_registry import DpidRegistry
+from stats_collector import StatsCollector, SocketStatsCollector
+from port_scheduler import AdaptivePortScheduler
+from rate_estimator import PortRateEstimator
+from alerts import AlertEngine, JsonLinesSink, UnixSocketSink
+from hotspots import HotspotTracker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bandwidth_shm
 
 def load_topology_from_file(filepath="topology.json"):
     with open(filepath, "r") as f:
@@ -14,17 +24,22 @@ def load_topology_from_file(filepath="topology.json"):
     return topology
 
 class MinimalRyuSwitchMonitor:
-    def __init__(self, controller_ip='127.0.0.1', rest_port=8080, topology_file="topology.json"):
+    def __init__(self, controller_ip='127.0.0.1', rest_port=8080, topology_file="topology.json", matrix_rate='10s',
+                 alert_socket=None, top_k=10, matrix_shm=bandwidth_shm.DEFAULT_PATH):
         self.controller_ip = controller_ip
         self.rest_port = rest_port
         self.base_url = f"http://{controller_ip}:{rest_port}"
         self.switches = []
         self.aps = []  
-        self.switch_map = {} 
         self.port_stats = defaultdict(lambda: defaultdict(dict))
         self.previous_stats = defaultdict(lambda: defaultdict(dict))
         self.flow_stats = defaultdict(lambda: defaultdict(dict))
         self.previous_flow_stats = defaultdict(lambda: defaultdict(dict))
+        self.rates = PortRateEstimator()
+        # 'instant' or an EWMA horizon of PortRateEstimator ('1s', '10s', '60s')
+        self.matrix_rate = matrix_rate
+        self.hotspots = HotspotTracker(top_k)
+        self.matrix_publisher = bandwidth_shm.BandwidthMatrixWriter(matrix_shm) if matrix_shm else None
         
         try:
             self.topology = load_topology_from_file(topology_file)
@@ -32,8 +47,14 @@ class MinimalRyuSwitchMonitor:
             print(f"Nodes: {len(self.topology['nodes'])}")
             print(f"Links: {len(self.topology['links'])}")
             
-            self.topology_switches = [node for node in self.topology['nodes'] if node.startswith('s')]
-            self.topology_aps = [node for node in self.topology['nodes'] if node.startswith('ap')]
+            # topology.json written from a topology spec carries explicit node types
+            node_types = self.topology.get('node_types', {})
+            if node_types:
+                self.topology_switches = [node for node in self.topology['nodes'] if node_types.get(node) == 'switch']
+                self.topology_aps = [node for node in self.topology['nodes'] if node_types.get(node) == 'ap']
+            else:
+                self.topology_switches = [node for node in self.topology['nodes'] if node.startswith('s')]
+                self.topology_aps = [node for node in self.topology['nodes'] if node.startswith('ap')]
             print(f"Switches in topology: {self.topology_switches}")
             print(f"APs in topology: {self.topology_aps}")
         except Exception as e:
@@ -41,6 +62,16 @@ class MinimalRyuSwitchMonitor:
             self.topology = {"nodes": [], "links": []}
             self.topology_switches = []
             self.topology_aps = []
+
+        self.registry = DpidRegistry(self.topology)
+        # (device, port) -> device on the other end, for labelling hot links
+        self.port_peers = {}
+        for link in self.topology['links']:
+            src_port, dst_port = link.get('src_port'), link.get('dst_port')
+            if src_port is not None and src_port != -1:
+                self.port_peers[(link['src'], src_port)] = link['dst']
+            if dst_port is not None and dst_port != -1:
+                self.port_peers[(link['dst'], dst_port)] = link['src']
         
         self.base_dir = "Results"
         self.viz_dir = os.path.join(self.base_dir, "bandwidth_viz")
@@ -52,6 +83,11 @@ class MinimalRyuSwitchMonitor:
 
         self.topology_file = os.path.join(self.base_dir, "topology.json")
 
+        alert_sinks = [JsonLinesSink(os.path.join(self.base_dir, "alerts.jsonl"))]
+        if alert_socket:
+            alert_sinks.append(UnixSocketSink(alert_socket))
+        self.alerts = AlertEngine(alert_sinks)
+
 
         if not os.path.exists(self.base_dir):
             os.makedirs(self.base_dir)
@@ -70,7 +106,8 @@ class MinimalRyuSwitchMonitor:
                 'Timestamp', 'Cycle', 'Switch DPID', 'Switch Name', 'Port',
                 'TX Bytes', 'RX Bytes', 'TX Packets', 'RX Packets',
                 'TX Errors', 'RX Errors', 'TX Dropped', 'RX Dropped',
-                'TX Mbps', 'RX Mbps', 'Total Mbps', 'Free BW (Mbps)'
+                'TX Mbps', 'RX Mbps', 'Total Mbps', 'Free BW (Mbps)',
+                'EWMA 1s Mbps', 'EWMA 10s Mbps', 'EWMA 60s Mbps', 'Peak Mbps'
             ])
         
         with open(self.flow_csv, mode='w', newline='') as f:
@@ -82,9 +119,10 @@ class MinimalRyuSwitchMonitor:
             
         with open(self.switch_csv, mode='w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(['Timestamp', 'Cycle', 'Switch DPID', 'Switch Name', 'Type'])
+            writer.writerow(['Timestamp', 'Cycle', 'Switch DPID', 'Switch Name', 'Type', 'Event'])
         
         self.current_cycle = 0
+        self.skipped_devices = []
 
     def generate_port_connections_report(self):
         """Generate a report showing each port's connection details."""
@@ -99,7 +137,7 @@ class MinimalRyuSwitchMonitor:
             
                 for dpid in all_devices:
                     device_name = self.get_switch_name(dpid)
-                    device_type = "AP" if device_name.startswith('ap') else "Switch"
+                    device_type = "AP" if self.is_ap(dpid) else "Switch"
                     f.write(f"\n{device_name} ({device_type}, DPID {dpid}):\n")
                     f.write("=" * 60 + "\n")
                     f.write(f"{'Port':<6} {'Connected To':<20} {'Remote Port':<12} {'Bandwidth':<10} {'Delay':<10}\n")
@@ -157,104 +195,95 @@ class MinimalRyuSwitchMonitor:
         for dpid, port_data in self.port_stats.items():
             device_name = self.get_switch_name(dpid)
             node_port_stats[device_name] = {}
-        
-            for port_no, stats in port_data.items():
-                if dpid in self.previous_stats and port_no in self.previous_stats[dpid]:
-                    prev = self.previous_stats[dpid][port_no]
-                    curr = stats
-                    time_diff = curr['timestamp'] - prev['timestamp']
-                
-                    if time_diff > 0:
-                        tx_diff = curr['tx_bytes'] - prev['tx_bytes']
-                        rx_diff = curr['rx_bytes'] - prev['rx_bytes']
-                    
-                        tx_mbps = (tx_diff * 8) / (time_diff * 1_000_000)
-                        rx_mbps = (rx_diff * 8) / (time_diff * 1_000_000)
-                    
-                        node_port_stats[device_name][port_no] = {
-                            'tx_mbps': tx_mbps,
-                            'rx_mbps': rx_mbps,
-                            'total_mbps': tx_mbps + rx_mbps
-                        }
+
+            for port_no in port_data:
+                smoothed = self.rates.get(dpid, port_no)
+                if smoothed is None:
+                    continue
+                instant = self.rates.instant.get((dpid, port_no), (0, 0))
+                if self.matrix_rate == 'instant':
+                    tx_mbps, rx_mbps = instant
+                else:
+                    tx_mbps, rx_mbps = smoothed[f'tx_{self.matrix_rate}'], smoothed[f'rx_{self.matrix_rate}']
+
+                node_port_stats[device_name][port_no] = {
+                    'tx_mbps': tx_mbps,
+                    'rx_mbps': rx_mbps,
+                    'total_mbps': tx_mbps + rx_mbps,
+                    'instant_mbps': sum(instant),
+                    'peak_mbps': smoothed['peak']
+                }
+        if self.matrix_publisher:
+            self.publish_bandwidth_matrix(node_port_stats)
         from sdn import save_adjacency_matrix 
         save_adjacency_matrix(self.topology, node_port_stats)
 
 
-    def map_dpid_to_switch_name(self):
-        """Map DPIDs to switch and AP names based on topology."""
-        all_dpids = self.switches + self.aps
-        for dpid in all_dpids:
-            dpid_val = int(dpid, 16) if isinstance(dpid, str) else dpid
-            if dpid_val > 1000000000000: 
-                self.switch_map[dpid] = "s0"
-                continue
-            ap_name = f"ap{int(dpid, 16) - 10}" if isinstance(dpid, str) else f"ap{dpid - 10}"
-            switch_name = f"s{int(dpid, 16)}" if isinstance(dpid, str) else f"s{dpid}"
-            
-            if ap_name in self.topology_aps:
-                self.switch_map[dpid] = ap_name
-                if dpid not in self.aps:
-                    self.aps.append(dpid)
-                if dpid in self.switches:
-                    self.switches.remove(dpid)
-            elif switch_name in self.topology_switches or dpid in self.switches:
-                if dpid == 0 or dpid == "0000000000000000":
-                    self.switch_map[dpid] = "s0"
-                else:
-                    self.switch_map[dpid] = switch_name
-            else:
-                print(f"[WARNING] Cannot determine if {dpid} is a switch or AP, assuming switch")
-                self.switch_map[dpid] = f"s{dpid}"
-        print("Switch/AP mapping created:")
-        for dpid, name in self.switch_map.items():
-            device_type = "AP" if name.startswith("ap") else "Switch"
-            print(f"DPID {dpid} → {name} ({device_type})")
+    def publish_bandwidth_matrix(self, node_port_stats):
+        """Publish link capacity and usage matrices to shared memory for other processes.
+
+        Links to a switch or AP that is not connected to the controller get zero
+        capacity, which readers take as the link being down.
+        """
+        nodes = sorted(self.topology_switches + self.topology_aps)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        capacity = np.zeros((len(nodes), len(nodes)))
+        usage = np.zeros((len(nodes), len(nodes)))
+        live = {self.get_switch_name(dpid) for dpid in self.registry.members} & set(node_index)
+
+        for link in self.topology['links']:
+            if link['src'] in live and link['dst'] in live:
+                i, j = node_index[link['src']], node_index[link['dst']]
+                capacity[i][j] = capacity[j][i] = link.get('bw', 100)
+
+        for node, ports in node_port_stats.items():
+            for port_no, stats in ports.items():
+                peer = self.port_peers.get((node, port_no))
+                if node in node_index and peer in node_index:
+                    i, j = node_index[node], node_index[peer]
+                    usage[i][j] = usage[j][i] = max(usage[i][j], stats['total_mbps'])
+
+        try:
+            self.matrix_publisher.publish(nodes, capacity, usage)
+        except OSError as e:
+            print(f"Error publishing bandwidth matrix to {self.matrix_publisher.path}: {e}")
 
     def get_switch_name(self, dpid):
         """Get the logical switch or AP name for a DPID"""
-        return self.switch_map.get(dpid, f"s{dpid}")
+        return self.registry.name(dpid)
 
     def is_ap(self, dpid):
         """Check if the device with this DPID is an AP"""
-        device_name = self.get_switch_name(dpid)
-        return device_name.startswith('ap')
+        return self.registry.is_ap(dpid)
 
-    def get_switches(self):
-        try:
-            url = f"{self.base_url}/stats/switches"
-            response = requests.get(url, timeout=5)
-            if response.status_code != 200:
-                print(f"Error fetching switches: {response.status_code}")
-                return False
-
-            all_dpids = response.json()
-            print("\n[DEBUG] Raw devices from Ryu controller:", all_dpids)
-            
-            self.switches = []
-            self.aps = []
-            
-            for dpid in all_dpids:
-                dpid_decimal = int(dpid) if isinstance(dpid, int) else int(dpid, 16)
-                if dpid_decimal >= 11 and dpid_decimal <= 18:
-                    self.aps.append(dpid)
-                else:
-                    self.switches.append(dpid)
-            
-            print(f"[INFO] Identified APs: {self.aps}")
-            print(f"[INFO] Identified Switches: {self.switches}")
+    def update_membership(self, dpids):
+        """Apply the DPIDs reported by /stats/switches; only changes are recorded"""
+        joined, left = self.registry.update_members(dpids)
+        if joined or left:
+            self.switches = list(self.registry.switches)
+            self.aps = list(self.registry.aps)
+            self.record_membership_changes(joined, left)
 
-            self.map_dpid_to_switch_name()
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(self.switch_csv, mode='a', newline='') as f:
-                writer = csv.writer(f)
-                for dpid in self.switches:
-                    writer.writerow([timestamp, self.current_cycle, dpid, self.get_switch_name(dpid), "Switch"])
-                for dpid in self.aps:
-                    writer.writerow([timestamp, self.current_cycle, dpid, self.get_switch_name(dpid), "AP"])
-            return True
-        except Exception as e:
-            print(f"Exception fetching switches: {e}")
-            return False
+    def record_membership_changes(self, joined, left):
+        """Print and append join/leave events to switches.csv; the first call writes the full table"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with open(self.switch_csv, mode='a', newline='') as f:
+            writer = csv.writer(f)
+            for event, dpids in (("join", joined), ("leave", left)):
+                for dpid in sorted(dpids):
+                    device = self.registry.lookup(dpid)
+                    device_type = "AP" if device.type == 'ap' else "Switch"
+                    print(f"[{event.upper()}] DPID {dpid} → {device.name} ({device_type})")
+                    writer.writerow([timestamp, self.current_cycle, dpid, device.name, device_type, event])
+
+        for dpid in left:
+            self.rates.forget(dpid)
+            self.alerts.forget(dpid)
+            self.hotspots.forget(dpid)
+            self.port_stats.pop(dpid, None)
+            self.previous_stats.pop(dpid, None)
+            self.flow_stats.pop(dpid, None)
+            self.previous_flow_stats.pop(dpid, None)
 
     def get_ap_link_bandwidth(self, ap_name, port_no=None):
         """Get the bandwidth capacity for an AP link."""
@@ -271,106 +300,92 @@ class MinimalRyuSwitchMonitor:
             print(f"Error getting AP link bandwidth: {e}")
             return 100
 
-    def collect_port_stats(self):
-        """collect port statistics for both switches and aps."""
-        success = False
-        all_devices = self.switches + self.aps
-    
-        for dpid in all_devices:
-            try:
-                url = f"{self.base_url}/stats/port/{dpid}"
-                response = requests.get(url, timeout=5)
-                if response.status_code != 200:
-                    print(f"failed to fetch port stats for device {dpid}: {response.status_code}")
-                    continue
-            
-                stats = response.json().get(str(dpid))
-                if not stats:
-                    print(f"No port stats received for device {dpid}")
-                    continue
-            
-                self.previous_stats[dpid] = self.port_stats[dpid].copy() if dpid in self.port_stats else {}
-            
-                for port_stat in stats:
-                    port_no = port_stat.get('port_no')
-                    if port_no is None:
-                        continue
-                
-                    if isinstance(port_no, str) or port_no > 65000 or port_no < 0:
-                        print(f"local port {port_no} detected on device {dpid} - collecting data")
-                    self.port_stats[dpid][port_no] = {
-                        'rx_bytes': port_stat.get('rx_bytes', 0),
-                        'tx_bytes': port_stat.get('tx_bytes', 0),
-                        'rx_packets': port_stat.get('rx_packets', 0),
-                        'tx_packets': port_stat.get('tx_packets', 0),
-                        'rx_errors': port_stat.get('rx_errors', 0),
-                        'tx_errors': port_stat.get('tx_errors', 0),
-                        'rx_dropped': port_stat.get('rx_dropped', 0),
-                        'tx_dropped': port_stat.get('tx_dropped', 0),
-                        'timestamp': time.time(),
-                        'is_special': isinstance(port_no, str) or port_no > 65000 or port_no < 0
-                    }
-                success = True
-            except Exception as e:
-                print(f"exception collecting port stats for device {dpid}: {e}")
-
-        return success
-
-    def collect_flow_stats(self):
-        """collect flow statistics for both switches and aps."""
-        success = False
-        all_devices = self.switches + self.aps
-        
-        for dpid in all_devices:
-            try:
-                url = f"{self.base_url}/stats/flow/{dpid}"
-                response = requests.get(url, timeout=5)
-                if response.status_code != 200:
-                    print(f"Failed to fetch flow stats for device {dpid}: {response.status_code}")
-                    continue
-                
-                stats = response.json().get(str(dpid))
-                if not stats:
-                    print(f"No flow stats received for device {dpid}")
-                    continue
-                
-                self.previous_flow_stats[dpid] = self.flow_stats[dpid].copy() if dpid in self.flow_stats else {}
-                
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                with open(self.flow_csv, mode='a', newline='') as f:
-                    writer = csv.writer(f)
-                    
-                    for flow in stats:
-                        table_id = flow.get('table_id', 0)
-                        priority = flow.get('priority', 0)
-                        match = str(flow.get('match', {}))
-                        actions = str(flow.get('actions', []))
-                        packet_count = flow.get('packet_count', 0)
-                        byte_count = flow.get('byte_count', 0)
-                        duration_sec = flow.get('duration_sec', 0)
-                        
-                        flow_id = f"{table_id}_{priority}_{hash(match)}"
-                        
-                        self.flow_stats[dpid][flow_id] = {
-                            'table_id': table_id,
-                            'priority': priority,
-                            'match': match,
-                            'actions': actions,
-                            'packet_count': packet_count,
-                            'byte_count': byte_count,
-                            'duration_sec': duration_sec,
-                            'timestamp': time.time()
-                        }
-                        
-                        writer.writerow([
-                            timestamp, self.current_cycle, dpid, self.get_switch_name(dpid), 
-                            table_id, priority, match, actions, packet_count, byte_count, duration_sec
-                        ])
-                success = True
-            except Exception as e:
-                print(f"xception collecting flow stats for device {dpid}: {e}")
-        
-        return success
+    def record_port_stats(self, dpid, stats, timestamp=None):
+        """Store one /stats/port reply for a switch or AP, keeping the previous sample for rates"""
+        if not stats:
+            print(f"No port stats received for device {dpid}")
+            return False
+
+        timestamp = timestamp or time.time()
+
+        for port_stat in stats:
+            port_no = port_stat.get('port_no')
+            if port_no is None:
+                continue
+
+            # Adaptively polled ports carry their own sample time; an unchanged
+            # sample keeps its previous pair so its rate is not reset to zero
+            sampled_at = port_stat.get('timestamp', timestamp)
+            current = self.port_stats[dpid].get(port_no)
+            if current and current['timestamp'] == sampled_at:
+                continue
+            if current:
+                self.previous_stats[dpid][port_no] = current
+
+            if isinstance(port_no, str) or port_no > 65000 or port_no < 0:
+                print(f"local port {port_no} detected on device {dpid} - collecting data")
+            self.port_stats[dpid][port_no] = {
+                'rx_bytes': port_stat.get('rx_bytes', 0),
+                'tx_bytes': port_stat.get('tx_bytes', 0),
+                'rx_packets': port_stat.get('rx_packets', 0),
+                'tx_packets': port_stat.get('tx_packets', 0),
+                'rx_errors': port_stat.get('rx_errors', 0),
+                'tx_errors': port_stat.get('tx_errors', 0),
+                'rx_dropped': port_stat.get('rx_dropped', 0),
+                'tx_dropped': port_stat.get('tx_dropped', 0),
+                'timestamp': sampled_at,
+                'is_special': isinstance(port_no, str) or port_no > 65000 or port_no < 0
+            }
+        return True
+
+    def record_flow_stats(self, dpid, stats):
+        """Store one /stats/flow reply for a switch or AP and append it to flow_stats.csv"""
+        if not stats:
+            print(f"No flow stats received for device {dpid}")
+            return False
+
+        self.previous_flow_stats[dpid] = self.flow_stats[dpid].copy() if dpid in self.flow_stats else {}
+
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        now = time.time()
+        device_name = self.get_switch_name(dpid)
+        self.hotspots.clear_flows(dpid)
+        with open(self.flow_csv, mode='a', newline='') as f:
+            writer = csv.writer(f)
+
+            for flow in stats:
+                table_id = flow.get('table_id', 0)
+                priority = flow.get('priority', 0)
+                match = str(flow.get('match', {}))
+                actions = str(flow.get('actions', []))
+                packet_count = flow.get('packet_count', 0)
+                byte_count = flow.get('byte_count', 0)
+                duration_sec = flow.get('duration_sec', 0)
+
+                flow_id = f"{table_id}_{priority}_{hash(match)}"
+
+                self.flow_stats[dpid][flow_id] = {
+                    'table_id': table_id,
+                    'priority': priority,
+                    'match': match,
+                    'actions': actions,
+                    'packet_count': packet_count,
+                    'byte_count': byte_count,
+                    'duration_sec': duration_sec,
+                    'timestamp': now
+                }
+
+                prev = self.previous_flow_stats[dpid].get(flow_id)
+                if prev and now > prev['timestamp'] and byte_count >= prev['byte_count']:
+                    byte_rate = (byte_count - prev['byte_count']) / (now - prev['timestamp'])
+                    self.hotspots.update_flow((dpid, flow_id), byte_rate, device=device_name, table_id=table_id,
+                                              priority=priority, match=match)
+
+                writer.writerow([
+                    timestamp, self.current_cycle, dpid, device_name,
+                    table_id, priority, match, actions, packet_count, byte_count, duration_sec
+                ])
+        return True
 
     def find_link_info(self, device_id, port_no):
         """find link info for any device (switch or AP)."""
@@ -408,7 +423,6 @@ class MinimalRyuSwitchMonitor:
             
                 for dpid in all_devices:
                     device_name = self.get_switch_name(dpid)
-                    is_ap = device_name.startswith('ap')
                 
                     for port_no, curr in self.port_stats[dpid].items():
                         prev = self.previous_stats.get(dpid, {}).get(port_no)
@@ -423,35 +437,33 @@ class MinimalRyuSwitchMonitor:
                                 tx_mbps = (tx_diff * 8) / (time_diff * 1_000_000)
                                 rx_mbps = (rx_diff * 8) / (time_diff * 1_000_000)
                                 total_mbps = tx_mbps + rx_mbps
+                                new_sample = self.rates.update(dpid, port_no, tx_mbps, rx_mbps, curr['timestamp'])
                             
                                 if is_special:
                                     bw_limit = float('inf')
                                     free_bw = float('inf')
                                     print(f"Special port {port_no} on {device_name} - TX: {tx_mbps:.2f} Mbps, RX: {rx_mbps:.2f} Mbps")
-                                elif is_ap:
-                                    bw_limit = self.get_ap_link_bandwidth(device_name, port_no)
+                                else:
+                                    bw_limit = self.registry.port_capacity(dpid, port_no)
                                     free_bw = bw_limit - total_mbps if bw_limit > 0 else 0
                                     free_bw = max(0, free_bw)
-                                else:
-                                    link_info = self.find_link_info(device_name, port_no)
-                                    if link_info:
-                                        bw_limit = link_info.get('bw', 100)
-                                        free_bw = bw_limit - total_mbps if bw_limit > 0 else 0
-                                        free_bw = max(0, free_bw)
-                                    else:
-                                        bw_limit = 100
-                                        free_bw = bw_limit - total_mbps
-                                        free_bw = max(0, free_bw)
                         
-                                if not is_special and free_bw < 5:
-                                    print(f"Port {port_no} on {device_name} is near capacity - only {free_bw:.2f} Mbps free")
+                                if new_sample and not is_special:
+                                    self.alerts.observe(dpid, port_no, device_name, total_mbps, bw_limit, curr['timestamp'])
+                                    if bw_limit > 0:
+                                        self.hotspots.update_link(
+                                            (dpid, port_no), total_mbps / bw_limit, device=device_name, port=port_no,
+                                            peer=self.port_peers.get((device_name, port_no), '?'),
+                                            total_mbps=total_mbps, capacity=bw_limit)
                             else:
                                 tx_mbps = rx_mbps = total_mbps = 0
                                 free_bw = 100 if not is_special else float('inf')
                         else:
                             tx_mbps = rx_mbps = total_mbps = 0
                             free_bw = 100 if not is_special else float('inf')
-                    
+
+                        smoothed = self.rates.get(dpid, port_no)
+                        ewma = [f"{smoothed[key]:.6f}" for key in ('total_1s', 'total_10s', 'total_60s', 'peak')] if smoothed else [""] * 4
                         writer.writerow([
                             timestamp, self.current_cycle, dpid, device_name, port_no,
                             curr['tx_bytes'], curr['rx_bytes'],
@@ -460,7 +472,7 @@ class MinimalRyuSwitchMonitor:
                             curr['tx_dropped'], curr['rx_dropped'],
                             f"{tx_mbps:.6f}", f"{rx_mbps:.6f}", f"{total_mbps:.6f}",
                             f"{free_bw:.6f}" if not is_special else "N/A"
-                        ])
+                        ] + ewma)
         except Exception as e:
             print(f"Error calculating port bandwidth: {e}")
 
@@ -471,6 +483,11 @@ class MinimalRyuSwitchMonitor:
             with open(report_file, 'w') as f:
                 f.write(f"=== Ryu Network Monitor Report - Cycle {self.current_cycle} ===\n")
                 f.write(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+                f.write("=== Hotspots ===\n")
+                for line in self.hotspots.report_lines():
+                    f.write(line + "\n")
+                f.write("\n")
                 
                 f.write("=== Topology Summary ===\n")
                 f.write(f"Nodes in topology: {len(self.topology['nodes'])}\n")
@@ -487,20 +504,25 @@ class MinimalRyuSwitchMonitor:
                 for dpid in self.aps:
                     f.write(f"  DPID {dpid} → {self.get_switch_name(dpid)}\n")
                 f.write("\n")
+
+                if self.skipped_devices:
+                    f.write("Skipped this cycle (unresponsive): " +
+                            ", ".join(f"{self.get_switch_name(d)} ({d})" for d in self.skipped_devices) + "\n\n")
                 
                 all_devices = self.switches + self.aps
                 f.write("=== Port Statistics ===\n")
                 
                 for dpid in all_devices:
                     device_name = self.get_switch_name(dpid)
-                    device_type = "AP" if device_name.startswith('ap') else "Switch"
+                    device_type = "AP" if self.is_ap(dpid) else "Switch"
                     f.write(f"\n{device_name} ({device_type}, DPID {dpid}):\n")
                     
                     if not self.port_stats[dpid]:
                         f.write("  No port statistics available\n")
                     else:
-                        f.write(f"{'Port':<6} {'TX Mbps':>10} {'RX Mbps':>10} {'TX Packets':>12} {'RX Packets':>12} {'Free BW':>10}\n")
-                        f.write("-" * 70 + "\n")
+                        f.write(f"{'Port':<6} {'TX Mbps':>10} {'RX Mbps':>10} {'TX Packets':>12} {'RX Packets':>12} {'Free BW':>10} "
+                                f"{'EWMA 10s':>10} {'EWMA 60s':>10} {'Peak':>10}\n")
+                        f.write("-" * 103 + "\n")
                         
                         def custom_sort_key(x):
                             try:
@@ -521,11 +543,7 @@ class MinimalRyuSwitchMonitor:
                                     rx_mbps = (rx_diff * 8) / (time_diff * 1_000_000)
                                     total_mbps = tx_mbps + rx_mbps
                                     
-                                    if device_name.startswith('ap'):
-                                        bw_limit = self.get_ap_link_bandwidth(device_name, port_no)
-                                    else:
-                                        link_info = self.find_link_info(device_name, port_no)
-                                        bw_limit = link_info.get('bw', 100) if link_info else 100
+                                    bw_limit = self.registry.port_capacity(dpid, port_no)
                                     
                                     free_bw = max(0, bw_limit - total_mbps)
                                 else:
@@ -535,12 +553,14 @@ class MinimalRyuSwitchMonitor:
                                 tx_mbps = rx_mbps = 0
                                 free_bw = 100
                             
-                            f.write(f"{port_no:<6} {tx_mbps:>10.3f} {rx_mbps:>10.3f} {curr['tx_packets']:>12} {curr['rx_packets']:>12} {free_bw:>10.3f}\n")
+                            smoothed = self.rates.get(dpid, port_no) or {'total_10s': 0, 'total_60s': 0, 'peak': 0}
+                            f.write(f"{port_no:<6} {tx_mbps:>10.3f} {rx_mbps:>10.3f} {curr['tx_packets']:>12} {curr['rx_packets']:>12} {free_bw:>10.3f} "
+                                    f"{smoothed['total_10s']:>10.3f} {smoothed['total_60s']:>10.3f} {smoothed['peak']:>10.3f}\n")
                 
                 f.write("\n\n=== Flow Statistics ===\n")
                 for dpid in all_devices:
                     device_name = self.get_switch_name(dpid)
-                    device_type = "AP" if device_name.startswith('ap') else "Switch"
+                    device_type = "AP" if self.is_ap(dpid) else "Switch"
                     f.write(f"\n{device_name} ({device_type}, DPID {dpid}):\n")
                     
                     if not self.flow_stats[dpid]:
@@ -571,7 +591,7 @@ class MinimalRyuSwitchMonitor:
             
             for dpid in all_devices:
                 device_name = self.get_switch_name(dpid)
-                device_type = "AP" if device_name.startswith('ap') else "Switch"
+                device_type = "AP" if self.is_ap(dpid) else "Switch"
                 
                 plt.figure(figsize=(12, 6))
                 
@@ -595,11 +615,7 @@ class MinimalRyuSwitchMonitor:
                             rx_mbps = (rx_diff * 8) / (time_diff * 1_000_000)
                             total_mbps = tx_mbps + rx_mbps
                             
-                            if device_name.startswith('ap'):
-                                bw_limit = self.get_ap_link_bandwidth(device_name, port)
-                            else:
-                                link_info = self.find_link_info(device_name, port)
-                                bw_limit = link_info.get('bw', 100) if link_info else 100
+                            bw_limit = self.registry.port_capacity(dpid, port)
                             
                             free_bw = max(0, bw_limit - total_mbps)
                             
@@ -629,44 +645,52 @@ class MinimalRyuSwitchMonitor:
         except Exception as e:
             print(f"Error plotting bandwidth: {e}")
 
-    def monitor_network(self, interval=5, cycles=3):
+    def consume(self, tick):
+        """StatsCollector consumer: CSV logging, reports, bandwidth matrix and plots"""
+        self.current_cycle = tick['cycle']
+        self.skipped_devices = tick.get('skipped', [])
+        self.update_membership(tick['dpids'])
+        if not self.switches and not self.aps:
+            print("no network devices discovered")
+            return
+
+        for dpid, stats in tick['port_replies'].items():
+            self.record_port_stats(dpid, stats, tick['polled_at'].get(dpid))
+        for dpid, stats in tick['flow_replies'].items():
+            self.record_flow_stats(dpid, stats)
+
+        # The baseline poll only seeds the counters
+        if self.current_cycle == 0:
+            return
+
+        print(f"\n===== Monitoring Cycle {self.current_cycle} =====")
+        self.calculate_port_bandwidth()
+        self.hotspots.refresh()
+        self.generate_bandwidth_matrix()
+
+        self.generate_report()
+        self.generate_port_connections_report()
+        if self.current_cycle >= 2:
+            self.plot_port_bandwidth()
+
+    def monitor_network(self, interval=5, cycles=3, collector=None, scheduler=None):
+        """Run the monitor on a StatsCollector, which other views may share"""
         print("===== Starting Ryu Network Monitor =====")
         print(f"Topology loaded with {len(self.topology['nodes'])} nodes and {len(self.topology['links'])} links")
-        
-        for cycle in range(1, cycles+1):
-            self.current_cycle = cycle
-            print(f"\n===== Monitoring Cycle {cycle}/{cycles} =====")
-            
-            if not self.get_switches():
-                print("failed to fetch switches - will try again next cycle")
-                time.sleep(2)
-                continue
-            
-            if not self.switches and not self.aps:
-                print("no network devices discovered. Waiting before retry")
-                time.sleep(2)
-                continue
-            
-            self.collect_port_stats()
-            self.collect_flow_stats()
-            
-            print(f"\nWaiting {interval} seconds to calculate bandwidth")
-            time.sleep(interval)
-            
-            self.collect_port_stats()
-            self.collect_flow_stats()
-            self.calculate_port_bandwidth()
-            self.generate_bandwidth_matrix()
-            
-            self.generate_report()
-            self.generate_port_connections_report()
-            if cycle >= 2:
-                self.plot_port_bandwidth()
-            
-            if cycle < cycles:
-                time.sleep(1)
-        
+
+        collector = collector or StatsCollector(self.controller_ip, self.rest_port)
+        collector.subscribe(self.consume, flows=True)
+        if scheduler is not None:
+            scheduler.capacity = self.registry.port_capacity
+            collector.run_adaptive(scheduler, interval=interval, cycles=cycles)
+        else:
+            collector.run(interval=interval, cycles=cycles)
+
         print(f"\n===== Monitoring Complete =====")
+        skipped = {dpid: h for dpid, h in collector.health.summary().items() if h['skipped'] or h['open']}
+        for dpid, h in sorted(skipped.items()):
+            state = "still failing" if h['open'] else "recovered"
+            print(f"Skipped {self.get_switch_name(dpid)} (DPID {dpid}) in {h['skipped']} poll(s), {state}")
         print(f"Data saved to directory: {self.base_dir}")
         print(f"Bandwidth visualizations saved to: {self.viz_dir}")
 
@@ -678,11 +702,39 @@ def main():
     parser.add_argument('--interval', type=int, default=5, help='Statistics collection interval in seconds')
     parser.add_argument('--cycles', type=int, default=3, help='Number of monitoring cycles')
     parser.add_argument('--topology', default='topology.json', help='Path to topology JSON file')
+    parser.add_argument('--views', default='', help='Extra views on the same stats poll: table,link')
+    parser.add_argument('--subscribe', nargs='?', const='/tmp/ryu_stats.sock', default=None,
+                        help='Read pushed snapshots from stats_publisher.py on this UNIX socket instead of polling REST')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Re-poll busy ports often and idle ports rarely between reports')
+    parser.add_argument('--matrix-rate', default='10s', choices=['instant', '1s', '10s', '60s'],
+                        help='Rate written to the bandwidth matrix: instantaneous or an EWMA horizon')
+    parser.add_argument('--alert-socket', default=None,
+                        help='Also send near-capacity alerts as JSON datagrams to this UNIX socket')
+    parser.add_argument('--top-k', type=int, default=10, help='Hottest links and flows listed at the top of each report')
+    parser.add_argument('--matrix-shm', default=bandwidth_shm.DEFAULT_PATH,
+                        help='Memory-mapped file the live bandwidth matrix is published to (empty to disable)')
+    parser.add_argument('--budget', type=float, default=20, help='Port stats requests per second in --adaptive mode')
     args = parser.parse_args()
 
+    if args.subscribe:
+        collector = SocketStatsCollector(args.subscribe)
+    else:
+        collector = StatsCollector(args.controller, args.port)
+    views = [v.strip() for v in args.views.split(',') if v.strip()]
+    if 'table' in views:
+        from monitor_ryu_switch_ports import RyuNetworkMonitor
+        collector.subscribe(RyuNetworkMonitor(args.controller, args.port).consume)
+    if 'link' in views:
+        from monitor_ryu_links import SimpleLinkMonitor
+        collector.subscribe(SimpleLinkMonitor(args.controller, args.port).consume)
+
     monitor = MinimalRyuSwitchMonitor(controller_ip=args.controller, rest_port=args.port, 
-                                     topology_file=args.topology)
-    monitor.monitor_network(interval=args.interval, cycles=args.cycles)
+                                     topology_file=args.topology, matrix_rate=args.matrix_rate,
+                                     alert_socket=args.alert_socket, top_k=args.top_k,
+                                     matrix_shm=args.matrix_shm)
+    scheduler = AdaptivePortScheduler(budget_per_second=args.budget) if args.adaptive and not args.subscribe else None
+    monitor.monitor_network(interval=args.interval, cycles=args.cycles, collector=collector, scheduler=scheduler)
 
 if __name__ == "__main__":
     if len(os.sys.argv) == 1:
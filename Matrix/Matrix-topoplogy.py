@@ -1,32 +1,26 @@
-import re
+import os
+import sys
 import json
 import numpy as np
 import csv
 from collections import defaultdict
 
-def get_topology_matrix():
-    topology_links = [
-        "net.addLink(s1, s5)", "net.addLink(s2, s4)", "net.addLink(s1, s3)", "net.addLink(s2, s6)",
-        "net.addLink(s3, s8)", "net.addLink(s4, s7)", "net.addLink(s3, s7)", "net.addLink(s4, s8)",
-        "net.addLink(s5, s9)", "net.addLink(s6, s10)", "net.addLink(s5, s10)", "net.addLink(s6, s9)",
-        "net.addLink(s7, ap1)", "net.addLink(s8, ap2)", "net.addLink(s9, ap3)", "net.addLink(s10, ap4)",
-        "net.addLink(s1, s0)", "net.addLink(s0, s2)", "net.addLink(s0, h0)", "net.addLink(ap5, s7)",
-        "net.addLink(ap6, s8)", "net.addLink(ap7, s9)", "net.addLink(ap8, s10)", "net.addLink(h8, s3)",
-        "net.addLink(h1, s7)", "net.addLink(h5, s4)", "net.addLink(h2, s8)", "net.addLink(h6, s5)",
-        "net.addLink(h3, s9)", "net.addLink(s6, h7)", "net.addLink(s10, h4)"
-    ]
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import topology_spec
 
+def get_topology_matrix(spec_path=None):
+    spec = topology_spec.load_spec(spec_path)
     adjacency = defaultdict(list)
     nodes = set()
+    bandwidth = {}
 
-    for line in topology_links:
-        match = re.findall(r"addLink\((\w+),\s*(\w+)\)", line)
-        if match:
-            node1, node2 = match[0]
-            adjacency[node1].append(node2)
-            adjacency[node2].append(node1)
-            nodes.add(node1)
-            nodes.add(node2)
+    for link in topology_spec.links(spec):
+        node1, node2 = link['src'], link['dst']
+        adjacency[node1].append(node2)
+        adjacency[node2].append(node1)
+        nodes.add(node1)
+        nodes.add(node2)
+        bandwidth[tuple(sorted([node1, node2]))] = link.get('bw', 10)
 
     try:
         from mininet.wifi.net import Mininet_wifi
@@ -56,7 +50,7 @@ def get_topology_matrix():
                 links.append({
                     "src": src,
                     "dst": dst,
-                    "bw": 10,  
+                    "bw": bandwidth.get(link_id, 10),
                     "delay": "5ms" 
                 })
                 processed_pairs.add(link_id)
@@ -68,8 +62,8 @@ def get_topology_matrix():
     
     return topology
 
-def save_topology_to_file(filepath="/tmp/topology.json"):
-    topology = get_topology_matrix()
+def save_topology_to_file(filepath="/tmp/topology.json", spec_path=None):
+    topology = get_topology_matrix(spec_path)
     with open(filepath, "w") as f:
         json.dump(topology, f, indent=2)
     print(f"Topology saved to {filepath}")
@@ -109,4 +103,4 @@ def save_adjacency_matrix(topology):
     print(f"\nAdjacency matrix saved to {csv_filename}")
 
 if __name__ == "__main__":
-    save_topology_to_file()
\ No newline at end of file
+    save_topology_to_file(spec_path=sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import json
+import os
+import socket
+import time
+
+
+class JsonLinesSink:
+    """Append every alert event as one JSON line"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def __call__(self, event):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(event) + "\n")
+
+
+class UnixSocketSink:
+    """Send every alert event as a datagram to a local listener; dropped if nobody listens"""
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def __call__(self, event):
+        try:
+            self.sock.sendto(json.dumps(event).encode(), self.path)
+        except OSError:
+            pass
+
+
+class AlertEngine:
+    """Near-capacity alerts per port with hysteresis, minimum durations and de-duplication.
+
+    A port goes pending when its utilisation (rate / link bw) reaches
+    raise_ratio. It fires once it has stayed there for min_duration seconds.
+    It resolves only after staying below clear_ratio for clear_duration
+    seconds. Only the firing and resolved transitions are emitted, so a port
+    that stays congested produces one event, not one per sample. observe() is
+    O(1), so a tick costs O(ports with a new sample).
+    """
+
+    def __init__(self, sinks=(), raise_ratio=0.95, clear_ratio=0.85, min_duration=2.0, clear_duration=5.0):
+        self.sinks = list(sinks)
+        self.raise_ratio = raise_ratio
+        self.clear_ratio = clear_ratio
+        self.min_duration = min_duration
+        self.clear_duration = clear_duration
+        self.ports = {}
+
+    def observe(self, dpid, port_no, device, total_mbps, capacity, now=None):
+        now = now or time.time()
+        if not capacity or capacity <= 0:
+            return None
+        utilisation = total_mbps / capacity
+        state = self.ports.setdefault((dpid, port_no), {'state': 'ok', 'since': now, 'fired_at': None})
+
+        if state['state'] in ('ok', 'pending'):
+            if utilisation < self.raise_ratio:
+                state['state'], state['since'] = 'ok', now
+                return None
+            if state['state'] == 'ok':
+                state['state'], state['since'] = 'pending', now
+            if now - state['since'] < self.min_duration:
+                return None
+            state['state'], state['fired_at'] = 'firing', now
+            return self.emit('firing', dpid, port_no, device, total_mbps, capacity, utilisation, state['since'], now)
+
+        # firing or clearing
+        if utilisation >= self.clear_ratio:
+            state['state'] = 'firing'
+            return None
+        if state['state'] == 'firing':
+            state['state'], state['clear_since'] = 'clearing', now
+        if now - state['clear_since'] < self.clear_duration:
+            return None
+        state['state'], state['since'] = 'ok', now
+        return self.emit('resolved', dpid, port_no, device, total_mbps, capacity, utilisation, state['fired_at'], now)
+
+    def emit(self, status, dpid, port_no, device, total_mbps, capacity, utilisation, since, now):
+        event = {
+            'alert': 'near_capacity',
+            'status': status,
+            'device': device,
+            'dpid': dpid,
+            'port': port_no,
+            'total_mbps': round(total_mbps, 3),
+            'capacity_mbps': capacity,
+            'utilisation': round(utilisation, 4),
+            'since': since,
+            'time': now
+        }
+        print(f"[ALERT] {device} port {port_no} {status}: {total_mbps:.2f}/{capacity} Mbps ({utilisation:.0%})")
+        for sink in self.sinks:
+            sink(event)
+        return event
+
+    def forget(self, dpid):
+        for key in [key for key in self.ports if key[0] == dpid]:
+            del self.ports[key]
+
+    def active(self):
+        """(dpid, port) of every port currently alerting"""
+        return [key for key, state in self.ports.items() if state['state'] in ('firing', 'clearing')]
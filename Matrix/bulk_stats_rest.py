@@ -0,0 +1,99 @@
+"""Ryu REST extension serving port/flow stats of every datapath in one response.
+
+Load it together with ofctl_rest:
+
+    ryu-manager ryu.app.simple_switch_13 ryu.app.ofctl_rest Matrix/bulk_stats_rest.py
+
+GET /stats/bulk/port and GET /stats/bulk/flow send the OpenFlow stats request to
+all datapaths at once and answer with
+
+    {"time": <request time>, "elapsed": <seconds>, "missing": [<dpid>, ...],
+     "timestamps": {"<dpid>": <reply time>, ...},
+     "stats": {"<dpid>": [<same entries as /stats/port/<dpid>>], ...}}
+
+Datapaths that do not answer within ofctl's timeout are listed in "missing".
+(/stats/port/all would be captured by ofctl_rest's /stats/port/{dpid} route.)
+"""
+import json
+import time
+
+from ryu.app.wsgi import ControllerBase, WSGIApplication, route
+from ryu.base import app_manager
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER, set_ev_cls
+from ryu.lib import hub
+from ryu.lib import ofctl_v1_3
+from ryu.ofproto import ofproto_v1_3
+from webob import Response
+
+APP_INSTANCE_NAME = 'bulk_stats_app'
+
+
+class BulkStatsRest(app_manager.RyuApp):
+    OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+    _CONTEXTS = {'wsgi': WSGIApplication}
+
+    def __init__(self, *args, **kwargs):
+        super(BulkStatsRest, self).__init__(*args, **kwargs)
+        self.datapaths = {}
+        self.waiters = {}
+        kwargs['wsgi'].register(BulkStatsController, {APP_INSTANCE_NAME: self})
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def _state_change_handler(self, ev):
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[datapath.id] = datapath
+        elif ev.state == DEAD_DISPATCHER:
+            self.datapaths.pop(datapath.id, None)
+            self.waiters.pop(datapath.id, None)
+
+    @set_ev_cls([ofp_event.EventOFPPortStatsReply, ofp_event.EventOFPFlowStatsReply], MAIN_DISPATCHER)
+    def _stats_reply_handler(self, ev):
+        msg = ev.msg
+        dp = msg.datapath
+        if msg.xid not in self.waiters.get(dp.id, {}):
+            return
+        lock, msgs = self.waiters[dp.id][msg.xid]
+        msgs.append(msg)
+        if msg.flags & dp.ofproto.OFPMPF_REPLY_MORE:
+            return
+        del self.waiters[dp.id][msg.xid]
+        lock.set()
+
+    def collect(self, fetch):
+        """Run fetch(dp, waiters) on every datapath concurrently and merge the replies"""
+        started = time.time()
+        replies, timestamps = {}, {}
+
+        def query(dp):
+            reply = fetch(dp, self.waiters)
+            timestamps[str(dp.id)] = time.time()
+            replies.update(reply or {})
+
+        hub.joinall([hub.spawn(query, dp) for dp in list(self.datapaths.values())])
+        stats = {dpid: entries for dpid, entries in replies.items() if entries}
+        return {
+            'time': started,
+            'elapsed': time.time() - started,
+            'missing': sorted(dpid for dpid in self.datapaths if str(dpid) not in stats),
+            'timestamps': {dpid: timestamps[dpid] for dpid in stats},
+            'stats': stats
+        }
+
+
+class BulkStatsController(ControllerBase):
+    def __init__(self, req, link, data, **config):
+        super(BulkStatsController, self).__init__(req, link, data, **config)
+        self.app = data[APP_INSTANCE_NAME]
+
+    def _json(self, body):
+        return Response(content_type='application/json', body=json.dumps(body).encode())
+
+    @route('bulkstats', '/stats/bulk/port', methods=['GET'])
+    def get_all_port_stats(self, req, **kwargs):
+        return self._json(self.app.collect(ofctl_v1_3.get_port_stats))
+
+    @route('bulkstats', '/stats/bulk/flow', methods=['GET'])
+    def get_all_flow_stats(self, req, **kwargs):
+        return self._json(self.app.collect(ofctl_v1_3.get_flow_stats))
@@ -0,0 +1,80 @@
+import time
+from collections import defaultdict, deque
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class DatapathHealth:
+    """Per-DPID request latency, adaptive timeouts and a circuit breaker.
+
+    The timeout of a DPID is a multiple of its observed p99 latency, clamped
+    to [min_timeout, max_timeout]. After failure_threshold consecutive
+    failures the breaker opens and the DPID is skipped for a backoff that
+    doubles on every re-trip; once it expires one cheap probe decides whether
+    the breaker closes again. A DPID that has never answered still waits the
+    full max_timeout, so its breaker opens on the first failure.
+    """
+
+    def __init__(self, max_timeout=5.0, min_timeout=0.2, p99_factor=3.0, window=100,
+                 failure_threshold=2, base_backoff=5.0, max_backoff=120.0):
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.p99_factor = p99_factor
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.failures = defaultdict(int)
+        self.trips = defaultdict(int)
+        self.open_until = {}
+        self.skipped = defaultdict(int)
+
+    def timeout(self, dpid):
+        samples = self.latencies[dpid]
+        if len(samples) < 10:
+            return self.max_timeout
+        return max(self.min_timeout, min(self.max_timeout, percentile(samples, 99) * self.p99_factor))
+
+    def is_open(self, dpid):
+        return dpid in self.open_until
+
+    def needs_probe(self, dpid):
+        """True once an open breaker's backoff has expired"""
+        return self.is_open(dpid) and time.time() >= self.open_until[dpid]
+
+    def allow(self, dpid):
+        """False while the breaker is open and the backoff has not expired"""
+        if self.is_open(dpid) and not self.needs_probe(dpid):
+            self.skipped[dpid] += 1
+            return False
+        return True
+
+    def record_success(self, dpid, latency):
+        self.latencies[dpid].append(latency)
+        self.failures[dpid] = 0
+        if self.open_until.pop(dpid, None) is not None:
+            self.trips[dpid] = 0
+            print(f"[HEALTH] DPID {dpid} is responding again")
+
+    def record_failure(self, dpid):
+        self.failures[dpid] += 1
+        if self.failures[dpid] >= self.failure_threshold or self.is_open(dpid) or not self.latencies.get(dpid):
+            self.trips[dpid] += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.trips[dpid] - 1))
+            self.open_until[dpid] = time.time() + backoff
+            print(f"[HEALTH] DPID {dpid} failed {self.failures[dpid]} time(s) - skipping it for {backoff:.1f}s")
+
+    def summary(self):
+        """Per-DPID p99 latency, current timeout, breaker state and how often it was skipped"""
+        dpids = set(self.latencies) | set(self.open_until) | set(self.skipped)
+        return {dpid: {
+            'p99': percentile(self.latencies[dpid], 99),
+            'timeout': self.timeout(dpid),
+            'open': self.is_open(dpid),
+            'skipped': self.skipped[dpid]
+        } for dpid in dpids}
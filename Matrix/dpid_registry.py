@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+Device = namedtuple('Device', ['dpid', 'name', 'type', 'capacity'])
+
+
+def dpid_to_int(dpid):
+    """Ryu reports DPIDs as integers, Mininet as 16-digit hex strings"""
+    return dpid if isinstance(dpid, int) else int(str(dpid).replace(':', ''), 16)
+
+
+class DpidRegistry:
+    """DPID -> (name, type, capacity) built once from the DPIDs published in topology.json.
+
+    capacity maps port number -> link bandwidth (Mbps) for the device's links.
+    Membership is whatever /stats/switches last reported; it is only
+    re-partitioned into switches and APs when that set changes.
+    """
+
+    def __init__(self, topology):
+        self.devices = {}
+        self.by_name = {}
+        self.members = frozenset()
+        self.switches = []
+        self.aps = []
+        self.load(topology)
+
+    def load(self, topology):
+        node_types = topology.get('node_types', {})
+        capacity = {}
+        for link in topology.get('links', []):
+            for end in ('src', 'dst'):
+                port = link.get(f'{end}_port', -1)
+                if port is not None and port != -1:
+                    capacity.setdefault(link[end], {})[port] = link.get('bw', 100)
+
+        self.devices.clear()
+        self.by_name.clear()
+        for name, dpid in topology.get('dpids', {}).items():
+            kind = node_types.get(name) or ('ap' if name.startswith('ap') else 'switch')
+            device = Device(dpid_to_int(dpid), name, kind, capacity.get(name, {}))
+            self.devices[device.dpid] = device
+            self.by_name[name] = device
+
+        if not self.devices:
+            print("[WARNING] topology.json has no 'dpids'; re-save it from Topology.py to name devices")
+
+    def lookup(self, dpid):
+        """Device for a DPID; unknown DPIDs are reported as switches named s<dpid>"""
+        device = self.devices.get(dpid_to_int(dpid))
+        if device is None:
+            device = Device(dpid_to_int(dpid), f"s{dpid}", 'switch', {})
+        return device
+
+    def name(self, dpid):
+        return self.lookup(dpid).name
+
+    def is_ap(self, dpid):
+        return self.lookup(dpid).type == 'ap'
+
+    def port_capacity(self, dpid, port_no, default=100):
+        return self.lookup(dpid).capacity.get(port_no, default)
+
+    def update_members(self, dpids):
+        """Record the DPIDs connected to the controller; return the (joined, left) sets"""
+        members = frozenset(dpids)
+        if members == self.members:
+            return frozenset(), frozenset()
+        joined, left = members - self.members, self.members - members
+        self.members = members
+        self.switches = sorted(d for d in members if not self.is_ap(d))
+        self.aps = sorted(d for d in members if self.is_ap(d))
+        unknown = [d for d in members if dpid_to_int(d) not in self.devices]
+        if unknown:
+            print(f"[WARNING] DPIDs not in topology: {unknown}")
+        return joined, left
@@ -0,0 +1,58 @@
+import heapq
+
+
+class HotspotTracker:
+    """Top-K links by utilisation and flows by byte rate, recomputed once per tick.
+
+    update_link/update_flow are O(1) dict writes for the samples that changed;
+    refresh() runs heapq.nlargest once (O(n log k)) and caches the result, so
+    top_links()/top_flows() queries are free until the next tick.
+    """
+
+    def __init__(self, k=10):
+        self.k = k
+        self.links = {}
+        self.flows = {}
+        self.hot_links = []
+        self.hot_flows = []
+
+    def update_link(self, key, utilisation, **details):
+        self.links[key] = dict(details, utilisation=utilisation)
+
+    def update_flow(self, key, byte_rate, **details):
+        self.flows[key] = dict(details, byte_rate=byte_rate)
+
+    def clear_flows(self, dpid):
+        """Drop a datapath's flows before its new flow table is recorded"""
+        for key in [key for key in self.flows if key[0] == dpid]:
+            del self.flows[key]
+
+    def forget(self, dpid):
+        self.clear_flows(dpid)
+        for key in [key for key in self.links if key[0] == dpid]:
+            del self.links[key]
+
+    def refresh(self):
+        self.hot_links = heapq.nlargest(self.k, self.links.values(), key=lambda link: link['utilisation'])
+        self.hot_flows = heapq.nlargest(self.k, self.flows.values(), key=lambda flow: flow['byte_rate'])
+
+    def top_links(self, k=None):
+        return self.hot_links[:k or self.k]
+
+    def top_flows(self, k=None):
+        return self.hot_flows[:k or self.k]
+
+    def report_lines(self, k=None):
+        lines = [f"Top {k or self.k} links by utilisation:"]
+        for i, link in enumerate(self.top_links(k), 1):
+            lines.append(f"  {i:>2}. {link['device']}:{link['port']} -> {link['peer']:<12} "
+                         f"{link['total_mbps']:>9.3f} / {link['capacity']} Mbps ({link['utilisation']:.1%})")
+        if not self.hot_links:
+            lines.append("  (no rate samples yet)")
+        lines.append(f"Top {k or self.k} flows by byte rate:")
+        for i, flow in enumerate(self.top_flows(k), 1):
+            lines.append(f"  {i:>2}. {flow['device']} table {flow['table_id']} prio {flow['priority']} "
+                         f"{flow['byte_rate'] * 8 / 1_000_000:>9.3f} Mbps  match {flow['match']}")
+        if not self.hot_flows:
+            lines.append("  (no flow samples yet)")
+        return lines
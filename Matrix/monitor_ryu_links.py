@@ -1,32 +1,55 @@
+import argparse
 import requests
 import time
+from collections import defaultdict
 
 class SimpleLinkMonitor:
-    def __init__(self, controller_ip='127.0.0.1', rest_port=8080):
+    def __init__(self, controller_ip='127.0.0.1', rest_port=8080, links=None, full_table_threshold=8):
         self.base_url = f"http://{controller_ip}:{rest_port}"
-        
-        self.link = {
-            'src': (1, 1),  
-            'dst': (2, 1)   
-        }
+        self.session = requests.Session()
+        # Above this many watched ports on one DPID a single full-table request is cheaper
+        self.full_table_threshold = full_table_threshold
 
-    def _get_port_list(self, dpid):
+        self.links = links or [{
+            'src': (1, 1),
+            'dst': (2, 1)
+        }]
+
+    def _get_json(self, path):
         try:
-            r = requests.get(f"{self.base_url}/stats/port/{dpid}")
+            r = self.session.get(f"{self.base_url}{path}", timeout=5)
             if r.status_code == 200:
-                return r.json().get(str(dpid), [])
+                return r.json()
         except Exception as e:
-            print(f"Error fetching stats for DPID {dpid}: {e}")
-        return []
+            print(f"Error fetching {path}: {e}")
+        return {}
+
+    def _get_port_list(self, dpid):
+        return self._get_json(f"/stats/port/{dpid}").get(str(dpid), [])
+
+    def _get_port(self, dpid, port):
+        return self._get_json(f"/stats/port/{dpid}/{port}").get(str(dpid), [])
+
+    def _endpoints(self):
+        """Watched ports grouped by DPID, each (dpid, port) once"""
+        ports_by_dpid = defaultdict(set)
+        for link in self.links:
+            for side in ('src','dst'):
+                dpid, port = link[side]
+                ports_by_dpid[dpid].add(port)
+        return ports_by_dpid
 
     def _snapshot(self):
         snap = {}
-        now = time.time()
-        for side in ('src','dst'):
-            dpid, port = self.link[side]
-            for p in self._get_port_list(dpid):
-                if p['port_no'] == port:
-                    snap.setdefault(dpid, {})[port] = {
+        for dpid, ports in self._endpoints().items():
+            if len(ports) > self.full_table_threshold:
+                replies = self._get_port_list(dpid)
+            else:
+                replies = [p for port in sorted(ports) for p in self._get_port(dpid, port)]
+            now = time.time()
+            for p in replies:
+                if p['port_no'] in ports:
+                    snap.setdefault(dpid, {})[p['port_no']] = {
                         'tx': p['tx_bytes'],
                         'rx': p['rx_bytes'],
                         'time': now
@@ -34,29 +57,43 @@ class SimpleLinkMonitor:
         return snap
 
     def calc_bandwidth(self, interval=5):
-        print(f"\n→ sampling traffic, waiting {interval}s …")
+        print(f"\n→ sampling traffic on {len(self.links)} link(s), waiting {interval}s …")
         first = self._snapshot()
         time.sleep(interval)
         second = self._snapshot()
 
-        for side in ('src','dst'):
-            dpid, port = self.link[side]
-            a = first.get(dpid, {}).get(port)
-            b = second.get(dpid, {}).get(port)
+        for link in self.links:
+            for side in ('src','dst'):
+                dpid, port = link[side]
+                a = first.get(dpid, {}).get(port)
+                b = second.get(dpid, {}).get(port)
+
+                if not a or not b:
+                    print(f"{side.upper()} {dpid}:{port} → Missing data, skipping")
+                    continue
 
-            if not a or not b:
-                print(f"{side.upper()} {dpid}:{port} → Missing data, skipping")
-                continue
+                delta_bytes = (b['tx'] + b['rx']) - (a['tx'] + a['rx'])
+                dt = b['time'] - a['time']
 
-            delta_bytes = (b['tx'] + b['rx']) - (a['tx'] + a['rx'])
-            dt = b['time'] - a['time']
+                if dt <= 0:
+                    print(f"{side.upper()} {dpid}:{port} → Invalid time gap ({dt:.3f}s), skipping")
+                    continue
 
-            if dt <= 0:
-                print(f"{side.upper()} {dpid}:{port} → Invalid time gap ({dt:.3f}s), skipping")
-                continue
+                mbps = (delta_bytes * 8) / (dt * 1_000_000)
+                print(f"{side.upper()} {dpid}:{port} → {mbps:.2f} Mbps")
 
-            mbps = (delta_bytes * 8) / (dt * 1_000_000)
-            print(f"{side.upper()} {dpid}:{port} → {mbps:.2f} Mbps")
+    def consume(self, tick):
+        """StatsCollector consumer: print the watched links' rates from a shared poll"""
+        if tick['cycle'] == 0:
+            return
+        for link in self.links:
+            for side in ('src','dst'):
+                dpid, port = link[side]
+                rate = tick['rates'].get(dpid, {}).get(port)
+                if not rate:
+                    print(f"{side.upper()} {dpid}:{port} → Missing data, skipping")
+                    continue
+                print(f"{side.upper()} {dpid}:{port} → {rate['total_mbps']:.2f} Mbps")
 
     def run(self, interval=5, cycles=3):
         print("Starting monitor")
@@ -65,6 +102,21 @@ class SimpleLinkMonitor:
             self.calc_bandwidth(interval)
 
 
+def parse_link(text):
+    """'1:1-2:1' -> {'src': (1, 1), 'dst': (2, 1)}"""
+    src, dst = text.split('-')
+    return {side: tuple(int(x) for x in end.split(':')) for side, end in (('src', src), ('dst', dst))}
+
+
 if __name__ == "__main__":
-    monitor = SimpleLinkMonitor(controller_ip="127.0.0.1", rest_port=8080)
-    monitor.run(interval=10, cycles=3)
+    parser = argparse.ArgumentParser(description="Watch the bandwidth of one or more links")
+    parser.add_argument('--controller', default='127.0.0.1', help='Controller IP address')
+    parser.add_argument('--port', type=int, default=8080, help='Controller REST API port')
+    parser.add_argument('--link', action='append', type=parse_link, default=None,
+                        help='Link as SRC_DPID:PORT-DST_DPID:PORT; repeat for more links')
+    parser.add_argument('--interval', type=int, default=10)
+    parser.add_argument('--cycles', type=int, default=3)
+    args = parser.parse_args()
+
+    monitor = SimpleLinkMonitor(controller_ip=args.controller, rest_port=args.port, links=args.link)
+    monitor.run(interval=args.interval, cycles=args.cycles)
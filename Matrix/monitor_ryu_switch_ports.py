@@ -6,6 +6,7 @@ import time
 import argparse
 from collections import defaultdict
 from tabulate import tabulate
+from stats_collector import StatsCollector
 
 class RyuNetworkMonitor:
     def __init__(self, controller_ip='127.0.0.1', rest_port=8080):
@@ -47,77 +48,6 @@ class RyuNetworkMonitor:
             print(f"Exception fetching links: {e}")
             return False
     
-    def collect_port_stats(self):
-        try:
-            for dpid in self.switches:
-                url = f"{self.base_url}/stats/port/{dpid}"
-                response = requests.get(url)
-                if response.status_code != 200:
-                    print(f"Failed to fetch stats for switch {dpid}: {response.status_code}")
-                    continue
-
-                stats = response.json().get(str(dpid))
-                if not stats:
-                    print(f"No stats found for switch {dpid}.")
-                    continue
-
-                self.previous_stats[dpid] = self.port_stats[dpid].copy()
-
-                for port_stat in stats:
-                    port_no = port_stat['port_no']
-                    if isinstance(port_no, str):
-                        try:
-                            port_no = int(port_no)
-                        except ValueError:
-                            continue
-                            
-                    if port_no > 65530:  
-                        continue
-                        
-                    self.port_stats[dpid][port_no] = {
-                        'rx_bytes': port_stat['rx_bytes'],
-                        'tx_bytes': port_stat['tx_bytes'],
-                        'rx_packets': port_stat['rx_packets'],
-                        'tx_packets': port_stat['tx_packets'],
-                        'timestamp': time.time()
-                    }
-            return True
-        except Exception as e:
-            print(f"Exception collecting port stats: {e}")
-            print(f"Error details: {type(e).__name__}: {str(e)}")
-            return False
-
-    def calculate_bandwidth(self, interval=5):
-        print(f"\nWaiting {interval} calculate bandwidth")
-        time.sleep(interval)
-        self.collect_port_stats()
-
-        bandwidth_data = {}
-        for dpid in self.switches:
-            bandwidth_data[dpid] = {}
-            for port_no, curr in self.port_stats[dpid].items():
-                prev = self.previous_stats[dpid].get(port_no)
-                if not prev:
-                    continue
-                    
-                time_diff = curr['timestamp'] - prev['timestamp']
-                if time_diff <= 0:
-                    continue
-                    
-                tx_diff = curr['tx_bytes'] - prev['tx_bytes']
-                rx_diff = curr['rx_bytes'] - prev['rx_bytes']
-                
-                tx_mbps = (tx_diff * 8) / (time_diff * 1_000_000)
-                rx_mbps = (rx_diff * 8) / (time_diff * 1_000_000)
-                
-                bandwidth_data[dpid][port_no] = {
-                    'tx_mbps': tx_mbps,
-                    'rx_mbps': rx_mbps,
-                    'total_mbps': tx_mbps + rx_mbps
-                }
-
-        return bandwidth_data
-    
     def display_port_stats(self, bandwidth_data):
         for dpid, ports in bandwidth_data.items():
             if not ports:
@@ -135,25 +65,23 @@ class RyuNetworkMonitor:
             print(f"\nSwitch {dpid} Bandwidth Statistics:")
             print(tabulate(table_data, headers=["Port", "TX (Mbps)", "RX (Mbps)", "Total (Mbps)"], tablefmt="grid"))
     
-    def monitor_network(self, interval=5, cycles=1):
+    def consume(self, tick):
+        """StatsCollector consumer: print the bandwidth table for the tick"""
+        self.switches = tick['dpids']
+        if tick['cycle'] == 0:
+            return
+        bandwidth_data = {dpid: {port_no: data for port_no, data in ports.items()
+                                 if isinstance(port_no, int) and port_no <= 65530}
+                          for dpid, ports in tick['rates'].items()}
+        self.display_port_stats(bandwidth_data)
+
+    def monitor_network(self, interval=5, cycles=1, collector=None):
         print("Starting monitoring")
-        
-        for cycle in range(cycles):
-            self.get_switches()
-            self.get_links()
-        
-            if not self.collect_port_stats():
-                print("Failed to collect port statistics")
-                time.sleep(1)
-                continue
-            try:
-                bandwidth_data = self.calculate_bandwidth(interval)
-                self.display_port_stats(bandwidth_data)
-            except Exception as e:
-                print(f"Error calculating bandwidth: {e}")
-            
-            if cycle < cycles - 1:
-                time.sleep(1)
+        self.get_links()
+
+        collector = collector or StatsCollector(self.controller_ip, self.rest_port)
+        collector.subscribe(self.consume)
+        collector.run(interval=interval, cycles=cycles)
 
 
 def main():
@@ -0,0 +1,119 @@
+import time
+
+
+def is_special_port(port_no):
+    return isinstance(port_no, str) or port_no > 65000 or port_no < 0
+
+
+class AdaptivePortScheduler:
+    """Decides which ports to re-poll, busiest first, within a global request budget.
+
+    Busy ports (at least busy_ratio of their link capacity) and ports that are
+    near capacity (less than near_capacity_mbps free) are polled every
+    min_interval seconds. Idle ports back off exponentially up to
+    max_interval, and ports in between get an interval that shrinks with their
+    utilisation. A token bucket caps requests at budget_per_second; requests
+    the collector makes on its own (switch list, flow tables, probes) are
+    charged to the same bucket. When more than full_table_threshold ports of
+    one DPID are due, they are fetched with one full-table request.
+    """
+
+    def __init__(self, budget_per_second=20, min_interval=1.0, max_interval=30.0, busy_ratio=0.5,
+                 near_capacity_mbps=5, idle_mbps=0.01, capacity=None, full_table_threshold=8):
+        self.budget = budget_per_second
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.busy_ratio = busy_ratio
+        self.near_capacity_mbps = near_capacity_mbps
+        self.idle_mbps = idle_mbps
+        self.capacity = capacity or (lambda dpid, port_no: 100)
+        self.full_table_threshold = full_table_threshold
+        self.ports = {}
+        self.tokens = budget_per_second
+        self.last_refill = time.time()
+        self.requests = 0
+
+    def record(self, dpid, entries, now):
+        """Store a /stats/port reply (full table or single port) and reschedule its ports"""
+        for entry in entries:
+            port_no = entry.get('port_no')
+            if port_no is None:
+                continue
+            state = self.ports.setdefault((dpid, port_no), {'interval': self.min_interval, 'rate': None})
+            prev = state.get('entry')
+            state['entry'] = dict(entry, timestamp=now)
+            if prev and now > prev['timestamp']:
+                tx_mbps = (entry['tx_bytes'] - prev['tx_bytes']) * 8 / ((now - prev['timestamp']) * 1_000_000)
+                rx_mbps = (entry['rx_bytes'] - prev['rx_bytes']) * 8 / ((now - prev['timestamp']) * 1_000_000)
+                state['rate'] = {'tx_mbps': tx_mbps, 'rx_mbps': rx_mbps, 'total_mbps': tx_mbps + rx_mbps}
+                state['interval'] = self.next_interval(dpid, port_no, state)
+            state['next_due'] = now + state['interval']
+
+    def next_interval(self, dpid, port_no, state):
+        if is_special_port(port_no):
+            return self.max_interval
+        total = state['rate']['total_mbps']
+        capacity = self.capacity(dpid, port_no)
+        if capacity - total < self.near_capacity_mbps or total >= self.busy_ratio * capacity:
+            return self.min_interval
+        if total < self.idle_mbps:
+            return min(self.max_interval, state['interval'] * 2)
+        utilisation = total / (self.busy_ratio * capacity)
+        return max(self.min_interval, self.max_interval * (1 - utilisation))
+
+    def _refill(self, now):
+        self.tokens = min(self.budget, self.tokens + (now - self.last_refill) * self.budget)
+        self.last_refill = now
+
+    def charge(self, count=1, now=None):
+        """Account for requests made outside due_requests(); the bucket may go into debt"""
+        self._refill(now or time.time())
+        self.tokens -= count
+        self.requests += count
+
+    def due_requests(self, now):
+        """(dpid, port_no) requests to issue now, most overdue first; port_no None means the full table"""
+        self._refill(now)
+        due = sorted((key for key, state in self.ports.items() if state['next_due'] <= now),
+                     key=lambda key: self.ports[key]['next_due'])
+        by_dpid = {}
+        for dpid, port_no in due:
+            by_dpid.setdefault(dpid, []).append(port_no)
+
+        requests = []
+        for dpid, ports in by_dpid.items():
+            batch = [(dpid, None)] if len(ports) > self.full_table_threshold else [(dpid, p) for p in ports]
+            for request in batch:
+                if self.tokens < 1:
+                    return requests
+                self.tokens -= 1
+                self.requests += 1
+                requests.append(request)
+        return requests
+
+    def postpone(self, dpid, port_no, now):
+        """Push back a request that could not be made (e.g. the DPID's circuit breaker is open)"""
+        for key, state in self.ports.items():
+            if key[0] == dpid and (port_no is None or key[1] == port_no):
+                state['next_due'] = now + state['interval']
+
+    def next_wakeup(self):
+        """When the next port becomes due, or the next token arrives if the budget is exhausted"""
+        next_due = min((state['next_due'] for state in self.ports.values()), default=time.time() + self.min_interval)
+        if self.tokens < 1:
+            next_due = max(next_due, self.last_refill + (1 - self.tokens) / self.budget)
+        return next_due
+
+    def snapshot(self):
+        """Latest entries per DPID and per-port rates, each port with its own sample time"""
+        port_replies, rates = {}, {}
+        for (dpid, port_no), state in self.ports.items():
+            port_replies.setdefault(dpid, []).append(state['entry'])
+            if state['rate'] is not None:
+                rates.setdefault(dpid, {})[port_no] = state['rate']
+        return port_replies, rates
+
+    def interval_counts(self):
+        fast = sum(1 for s in self.ports.values() if s['interval'] <= self.min_interval)
+        slow = sum(1 for s in self.ports.values() if s['interval'] >= self.max_interval)
+        return fast, len(self.ports) - fast - slow, slow
@@ -0,0 +1,63 @@
+import math
+
+HORIZONS = (('1s', 1.0), ('10s', 10.0), ('60s', 60.0))
+
+
+class PortRateEstimator:
+    """Time-aware EWMAs of TX/RX Mbps over several horizons plus a peak-hold, O(1) state per port.
+
+    Each sample moves an EWMA with time constant tau by 1 - exp(-dt / tau), so
+    irregular sampling (adaptive polling, skipped cycles) is weighted correctly.
+    The peak holds the highest total rate for peak_hold seconds and then
+    follows the current rate down.
+    """
+
+    def __init__(self, horizons=HORIZONS, peak_hold=60.0):
+        self.horizons = horizons
+        self.peak_hold = peak_hold
+        self.state = {}
+        self.instant = {}
+
+    def update(self, dpid, port_no, tx_mbps, rx_mbps, timestamp):
+        """Feed one rate sample; return False if it is not newer than the last one"""
+        state = self.state.get((dpid, port_no))
+        total = tx_mbps + rx_mbps
+        if state is None or timestamp > state['time']:
+            self.instant[(dpid, port_no)] = (tx_mbps, rx_mbps)
+        if state is None:
+            self.state[(dpid, port_no)] = {
+                'time': timestamp,
+                'ewma': [[tx_mbps, rx_mbps] for _ in self.horizons],
+                'peak': total,
+                'peak_time': timestamp
+            }
+            return True
+        dt = timestamp - state['time']
+        if dt <= 0:
+            return False
+        state['time'] = timestamp
+        for (_, tau), ewma in zip(self.horizons, state['ewma']):
+            alpha = 1 - math.exp(-dt / tau)
+            ewma[0] += alpha * (tx_mbps - ewma[0])
+            ewma[1] += alpha * (rx_mbps - ewma[1])
+        if total >= state['peak'] or timestamp - state['peak_time'] > self.peak_hold:
+            state['peak'] = total
+            state['peak_time'] = timestamp
+        return True
+
+    def get(self, dpid, port_no):
+        """{'tx_10s': ..., 'rx_10s': ..., 'total_10s': ..., ..., 'peak': ...} or None"""
+        state = self.state.get((dpid, port_no))
+        if state is None:
+            return None
+        rates = {'peak': state['peak']}
+        for (name, _), (tx, rx) in zip(self.horizons, state['ewma']):
+            rates[f'tx_{name}'] = tx
+            rates[f'rx_{name}'] = rx
+            rates[f'total_{name}'] = tx + rx
+        return rates
+
+    def forget(self, dpid):
+        for key in [key for key in self.state if key[0] == dpid]:
+            del self.state[key]
+            self.instant.pop(key, None)
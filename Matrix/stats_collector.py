@@ -0,0 +1,328 @@
+import json
+import socket
+import time
+import requests
+from datapath_health import DatapathHealth
+
+
+def port_rates(previous, current):
+    """TX/RX/total Mbps per (dpid, port) for ports present in both snapshots"""
+    rates = {}
+    for dpid, ports in current.items():
+        rates[dpid] = {}
+        for port_no, curr in ports.items():
+            prev = previous.get(dpid, {}).get(port_no)
+            if not prev:
+                continue
+            time_diff = curr['timestamp'] - prev['timestamp']
+            if time_diff <= 0:
+                continue
+            tx_mbps = ((curr['tx_bytes'] - prev['tx_bytes']) * 8) / (time_diff * 1_000_000)
+            rx_mbps = ((curr['rx_bytes'] - prev['rx_bytes']) * 8) / (time_diff * 1_000_000)
+            rates[dpid][port_no] = {
+                'tx_mbps': tx_mbps,
+                'rx_mbps': rx_mbps,
+                'total_mbps': tx_mbps + rx_mbps
+            }
+    return rates
+
+
+class StatsCollector:
+    """Polls the Ryu REST API once per tick and hands the result to every subscribed view.
+
+    A tick is a dict with:
+      cycle        - 0 for the baseline poll, then 1..cycles
+      time         - wall-clock time of the poll
+      dpids        - DPIDs reported by /stats/switches
+      port_replies - raw /stats/port replies per DPID
+      polled_at    - time each DPID's port reply arrived
+      ports        - per-port counters (tx/rx bytes and packets, timestamp)
+      rates        - per-port Mbps against the previous tick
+      flow_replies - raw /stats/flow replies per DPID (only if a view asked for flows)
+      skipped      - DPIDs left out of this tick (open circuit breaker, timeout, no bulk reply)
+    """
+
+    def __init__(self, controller_ip='127.0.0.1', rest_port=8080, timeout=5, bulk=None):
+        self.base_url = f"http://{controller_ip}:{rest_port}"
+        self.timeout = timeout
+        # None: try bulk_stats_rest.py's /stats/bulk endpoints and fall back to per-DPID requests
+        self.bulk = bulk
+        self.session = requests.Session()
+        self.health = DatapathHealth(max_timeout=timeout)
+        self.consumers = []
+        self.want_flows = False
+        self.previous = {}
+        self.cycle = 0
+
+    def subscribe(self, consumer, flows=False):
+        """Register consumer(tick); flows=True also polls /stats/flow every tick"""
+        self.consumers.append(consumer)
+        self.want_flows = self.want_flows or flows
+
+    def get_json(self, path, quiet=False, timeout=None):
+        try:
+            response = self.session.get(f"{self.base_url}{path}", timeout=timeout or self.timeout)
+            if response.status_code != 200:
+                if not quiet:
+                    print(f"Error fetching {path}: {response.status_code}")
+                return None
+            return response.json()
+        except Exception as e:
+            print(f"Exception fetching {path}: {e}")
+            return None
+
+    def fetch_switches(self):
+        return self.get_json("/stats/switches") or []
+
+    def fetch_dpid(self, dpid, path, timeout=None):
+        """GET a per-DPID endpoint with the DPID's adaptive timeout; None if it failed"""
+        started = time.time()
+        reply = self.get_json(path, timeout=timeout or self.health.timeout(dpid))
+        if reply is None:
+            self.health.record_failure(dpid)
+            return None
+        self.health.record_success(dpid, time.time() - started)
+        return reply.get(str(dpid), [])
+
+    def fetch_ports(self, dpid):
+        return self.fetch_dpid(dpid, f"/stats/port/{dpid}")
+
+    def fetch_flows(self, dpid):
+        return self.fetch_dpid(dpid, f"/stats/flow/{dpid}")
+
+    def available(self, dpid):
+        """Circuit breaker check; a DPID whose backoff expired gets one cheap /stats/desc probe"""
+        if not self.health.allow(dpid):
+            return False
+        if self.health.needs_probe(dpid):
+            return self.fetch_dpid(dpid, f"/stats/desc/{dpid}", timeout=self.health.min_timeout * 5) is not None
+        return True
+
+    def poll(self):
+        """Fetch switches, port and (if wanted) flow stats once"""
+        if self.bulk is not False:
+            tick = self.poll_bulk()
+            if tick is not None:
+                return tick
+
+        dpids = self.fetch_switches()
+        port_replies, polled_at, flow_replies, skipped = {}, {}, {}, []
+        for dpid in dpids:
+            replies = self.fetch_ports(dpid) if self.available(dpid) else None
+            if replies is None:
+                skipped.append(dpid)
+                continue
+            port_replies[dpid] = replies
+            polled_at[dpid] = time.time()
+            if self.want_flows:
+                flow_replies[dpid] = self.fetch_flows(dpid) or []
+        return self.make_tick(dpids, port_replies, polled_at, flow_replies, skipped)
+
+    def poll_bulk(self):
+        """One request per stats type via /stats/bulk/port and /stats/bulk/flow"""
+        reply = self.get_json("/stats/bulk/port", quiet=self.bulk is None)
+        if not isinstance(reply, dict) or 'stats' not in reply:
+            if self.bulk is None:
+                print("Bulk stats endpoint not available - polling each DPID")
+                self.bulk = False
+            return None
+        self.bulk = True
+
+        dpids = sorted([int(dpid) for dpid in reply['stats']] + reply.get('missing', []))
+        port_replies = {int(dpid): entries for dpid, entries in reply['stats'].items()}
+        polled_at = {int(dpid): ts for dpid, ts in reply.get('timestamps', {}).items()}
+        # The controller polls every datapath itself; keep the health record so skips are reported
+        for dpid in reply.get('missing', []):
+            self.health.record_failure(dpid)
+        for dpid, ts in polled_at.items():
+            self.health.record_success(dpid, ts - reply.get('time', ts))
+        flow_replies = {}
+        if self.want_flows:
+            flows = self.get_json("/stats/bulk/flow")
+            flow_replies = {int(dpid): entries for dpid, entries in (flows or {}).get('stats', {}).items()}
+        return self.make_tick(dpids, port_replies, polled_at, flow_replies, reply.get('missing', []))
+
+    def make_tick(self, dpids, port_replies, polled_at, flow_replies, skipped=()):
+        ports = {}
+        for dpid, replies in port_replies.items():
+            now = polled_at.get(dpid, time.time())
+            ports[dpid] = {
+                p['port_no']: {
+                    'tx_bytes': p.get('tx_bytes', 0),
+                    'rx_bytes': p.get('rx_bytes', 0),
+                    'tx_packets': p.get('tx_packets', 0),
+                    'rx_packets': p.get('rx_packets', 0),
+                    'timestamp': now
+                } for p in replies if 'port_no' in p
+            }
+
+        tick = {
+            'cycle': self.cycle,
+            'time': time.time(),
+            'dpids': dpids,
+            'port_replies': port_replies,
+            'polled_at': polled_at,
+            'ports': ports,
+            'rates': port_rates(self.previous, ports),
+            'flow_replies': flow_replies,
+            'skipped': list(skipped)
+        }
+        if skipped:
+            print(f"Skipped unresponsive datapaths this tick: {list(skipped)}")
+        # Skipped DPIDs keep their last counters so their next rate spans the gap
+        self.previous = {**self.previous, **ports}
+        return tick
+
+    def tick(self):
+        return self.dispatch(self.poll())
+
+    def dispatch(self, tick):
+        for consumer in self.consumers:
+            try:
+                consumer(tick)
+            except Exception as e:
+                print(f"Error in stats consumer {getattr(consumer, '__qualname__', consumer)}: {e}")
+        return tick
+
+    def poll_adaptive(self, scheduler, until):
+        """Issue the scheduler's due per-port requests until the given time"""
+        while time.time() < until:
+            for dpid, port_no in scheduler.due_requests(time.time()):
+                if self.health.needs_probe(dpid):
+                    scheduler.charge(1)
+                if not self.available(dpid):
+                    scheduler.postpone(dpid, port_no, time.time())
+                    continue
+                path = f"/stats/port/{dpid}" if port_no is None else f"/stats/port/{dpid}/{port_no}"
+                entries = self.fetch_dpid(dpid, path)
+                if entries is not None:
+                    scheduler.record(dpid, entries, time.time())
+                else:
+                    scheduler.postpone(dpid, port_no, time.time())
+            time.sleep(max(0.01, min(until, scheduler.next_wakeup()) - time.time()))
+
+    def run_adaptive(self, scheduler, interval=5, cycles=3):
+        """Like run(), but between ticks ports are re-polled as the scheduler decides"""
+        self.cycle = 0
+        baseline = self.tick()
+        if not self.bulk:
+            per_dpid = 2 if self.want_flows else 1
+            scheduler.charge(1 + per_dpid * len(baseline['dpids']))
+        else:
+            scheduler.charge(2 if self.want_flows else 1)
+        for dpid, entries in baseline['port_replies'].items():
+            scheduler.record(dpid, entries, baseline['polled_at'].get(dpid, baseline['time']))
+
+        for cycle in range(1, cycles + 1):
+            requests_before = scheduler.requests
+            self.poll_adaptive(scheduler, time.time() + interval)
+            self.cycle = cycle
+
+            dpids = self.fetch_switches()
+            scheduler.charge(1)
+            port_replies, rates = scheduler.snapshot()
+            flow_replies = {}
+            if self.want_flows:
+                for dpid in port_replies:
+                    if self.health.needs_probe(dpid):
+                        scheduler.charge(1)
+                    if self.available(dpid):
+                        scheduler.charge(1)
+                        flow_replies[dpid] = self.fetch_flows(dpid) or []
+            self.dispatch({
+                'cycle': cycle,
+                'time': time.time(),
+                'dpids': dpids,
+                'port_replies': port_replies,
+                'polled_at': {},
+                'ports': {dpid: {e['port_no']: e for e in entries} for dpid, entries in port_replies.items()},
+                'rates': rates,
+                'flow_replies': flow_replies,
+                'skipped': [dpid for dpid in dpids if self.health.is_open(dpid)]
+            })
+            fast, medium, slow = scheduler.interval_counts()
+            print(f"Adaptive polling: {scheduler.requests - requests_before} requests in {interval}s "
+                  f"({fast} fast, {medium} medium, {slow} slow ports)")
+
+    def run(self, interval=5, cycles=3):
+        """Baseline poll, then one poll per interval for the given number of cycles"""
+        self.cycle = 0
+        self.tick()
+        for cycle in range(1, cycles + 1):
+            time.sleep(interval)
+            self.cycle = cycle
+            self.tick()
+
+
+class SocketStatsCollector(StatsCollector):
+    """Same ticks as StatsCollector, but read from stats_publisher.py's UNIX socket instead of REST.
+
+    The Ryu app already polls the datapaths and computes rates, so a tick is
+    just the latest pushed snapshot; no HTTP request is made per DPID.
+    """
+
+    def __init__(self, socket_path='/tmp/ryu_stats.sock', timeout=30):
+        super().__init__()
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.stream = None
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.stream = sock.makefile('r')
+        print(f"Subscribed to stats snapshots on {self.socket_path}")
+
+    def read_snapshot(self):
+        if self.stream is None:
+            self.connect()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError(f"stats publisher on {self.socket_path} closed the connection")
+        return json.loads(line)
+
+    def poll(self):
+        return self.to_tick(self.read_snapshot())
+
+    def to_tick(self, snapshot):
+        dpids = snapshot['dpids']
+        port_replies = {dpid: snapshot['ports'].get(str(dpid), []) for dpid in dpids}
+        polled_at, ports, rates = {}, {}, {}
+        for dpid, replies in port_replies.items():
+            ports[dpid], rates[dpid] = {}, {}
+            for p in replies:
+                polled_at[dpid] = p['timestamp']
+                ports[dpid][p['port_no']] = {key: p[key] for key in
+                                             ('tx_bytes', 'rx_bytes', 'tx_packets', 'rx_packets', 'timestamp')}
+                if 'tx_mbps' in p:
+                    rates[dpid][p['port_no']] = {
+                        'tx_mbps': p['tx_mbps'],
+                        'rx_mbps': p['rx_mbps'],
+                        'total_mbps': p['tx_mbps'] + p['rx_mbps']
+                    }
+
+        tick = {
+            'cycle': self.cycle,
+            'time': snapshot['time'],
+            'dpids': dpids,
+            'port_replies': port_replies,
+            'polled_at': polled_at,
+            'ports': ports,
+            'rates': rates,
+            'flow_replies': {dpid: snapshot['flows'].get(str(dpid), []) for dpid in dpids} if self.want_flows else {},
+            'skipped': []
+        }
+        self.previous = ports
+        return tick
+
+    def run(self, interval=5, cycles=3):
+        """Baseline snapshot, then the first snapshot at least interval seconds after the last tick"""
+        self.cycle = 0
+        last = self.tick()['time']
+        while self.cycle < cycles:
+            snapshot = self.read_snapshot()
+            if snapshot['time'] - last < interval:
+                continue
+            self.cycle += 1
+            last = self.dispatch(self.to_tick(snapshot))['time']
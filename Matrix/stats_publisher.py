@@ -0,0 +1,189 @@
+"""Ryu app that polls port/flow stats in-process and pushes rate snapshots to local subscribers.
+
+Run next to the usual apps:
+
+    ryu-manager ryu.app.simple_switch_13 ryu.app.ofctl_rest Matrix/stats_publisher.py
+
+Every PUBLISH_INTERVAL seconds each connected subscriber on the UNIX socket
+SOCKET_PATH receives one JSON line:
+
+    {"time": ..., "dpids": [...],
+     "ports": {"<dpid>": [{"port_no": 1, "tx_bytes": ..., ..., "tx_mbps": ..., "rx_mbps": ...}]},
+     "flows": {"<dpid>": [{"table_id": 0, "priority": 1, "match": {...}, ..., "byte_rate": ...}]}}
+
+Port and flow entries use the same field names as ofctl_rest's /stats/port and
+/stats/flow replies, plus the rates computed here from consecutive replies.
+A subscriber that falls more than MAX_QUEUED snapshots behind is disconnected,
+so a slow reader never stalls polling.
+"""
+import json
+import os
+import socket
+import time
+
+import eventlet
+from eventlet.queue import LightQueue, Full
+from ryu.base import app_manager
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER, set_ev_cls
+from ryu.lib import hub
+from ryu.lib.ofctl_v1_3 import UTIL, match_to_str, actions_to_str
+from ryu.ofproto import ofproto_v1_3
+
+SOCKET_PATH = os.environ.get('RYU_STATS_SOCKET', '/tmp/ryu_stats.sock')
+PUBLISH_INTERVAL = float(os.environ.get('RYU_STATS_INTERVAL', '1'))
+MAX_QUEUED = int(os.environ.get('RYU_STATS_MAX_QUEUED', '10'))
+
+PORT_FIELDS = ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes', 'rx_dropped', 'tx_dropped',
+               'rx_errors', 'tx_errors', 'duration_sec')
+
+
+class StatsPublisher(app_manager.RyuApp):
+    OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+
+    def __init__(self, *args, **kwargs):
+        super(StatsPublisher, self).__init__(*args, **kwargs)
+        self.datapaths = {}
+        self.ports = {}
+        self.flows = {}
+        # (dpid, xid) -> (time of the first part, stats so far) while a multipart reply is incomplete
+        self.port_parts = {}
+        self.flow_parts = {}
+        self.subscribers = []
+        hub.spawn(self._serve)
+        hub.spawn(self._poll_loop)
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def _state_change_handler(self, ev):
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[datapath.id] = datapath
+        elif ev.state == DEAD_DISPATCHER:
+            self.datapaths.pop(datapath.id, None)
+            self.ports.pop(datapath.id, None)
+            self.flows.pop(datapath.id, None)
+            for parts in (self.port_parts, self.flow_parts):
+                for key in [key for key in parts if key[0] == datapath.id]:
+                    del parts[key]
+
+    def _serve(self):
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)
+        server = eventlet.listen(SOCKET_PATH, family=socket.AF_UNIX)
+        self.logger.info("Publishing stats snapshots on %s every %.1fs", SOCKET_PATH, PUBLISH_INTERVAL)
+        while True:
+            conn, _ = server.accept()
+            subscriber = {'conn': conn, 'queue': LightQueue(MAX_QUEUED)}
+            subscriber['thread'] = hub.spawn(self._send_loop, subscriber)
+            self.subscribers.append(subscriber)
+
+    def _send_loop(self, subscriber):
+        """Write queued snapshots to one subscriber; only this greenthread blocks on its socket"""
+        while True:
+            line = subscriber['queue'].get()
+            try:
+                subscriber['conn'].sendall(line)
+            except (OSError, socket.error):
+                self._drop(subscriber, kill=False)
+                return
+
+    def _drop(self, subscriber, kill=True):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        if kill:
+            hub.kill(subscriber['thread'])
+        subscriber['conn'].close()
+
+    def _gather(self, parts, ev):
+        """Collect the parts of a multipart reply; (time, stats) once the last part arrived, else None"""
+        msg = ev.msg
+        key = (msg.datapath.id, msg.xid)
+        if key not in parts:
+            # A reply whose last part never arrived is superseded by the next one
+            for stale in [k for k in parts if k[0] == key[0]]:
+                del parts[stale]
+            parts[key] = (time.time(), [])
+        parts[key][1].extend(msg.body)
+        if msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE:
+            return None
+        return parts.pop(key)
+
+    def _poll_loop(self):
+        while True:
+            self._publish()
+            for datapath in list(self.datapaths.values()):
+                parser, ofproto = datapath.ofproto_parser, datapath.ofproto
+                datapath.send_msg(parser.OFPPortStatsRequest(datapath, 0, ofproto.OFPP_ANY))
+                datapath.send_msg(parser.OFPFlowStatsRequest(datapath))
+            hub.sleep(PUBLISH_INTERVAL)
+
+    @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
+    def _port_stats_reply_handler(self, ev):
+        reply = self._gather(self.port_parts, ev)
+        if reply is None:
+            return
+        now, body = reply
+        dpid = ev.msg.datapath.id
+        previous = self.ports.get(dpid, {})
+        current = {}
+        for stat in body:
+            port_no = UTIL.ofp_port_to_user(stat.port_no)
+            entry = {field: getattr(stat, field) for field in PORT_FIELDS}
+            entry['port_no'] = port_no
+            entry['timestamp'] = now
+            prev = previous.get(port_no)
+            elapsed = now - prev['timestamp'] if prev else 0
+            if elapsed > 0:
+                entry['tx_mbps'] = (stat.tx_bytes - prev['tx_bytes']) * 8 / (elapsed * 1_000_000)
+                entry['rx_mbps'] = (stat.rx_bytes - prev['rx_bytes']) * 8 / (elapsed * 1_000_000)
+            current[port_no] = entry
+        self.ports[dpid] = current
+
+    @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
+    def _flow_stats_reply_handler(self, ev):
+        reply = self._gather(self.flow_parts, ev)
+        if reply is None:
+            return
+        _, body = reply
+        dpid = ev.msg.datapath.id
+        previous = self.flows.get(dpid, {})
+        current = {}
+        for stat in body:
+            match = match_to_str(stat.match)
+            key = (stat.table_id, stat.priority, json.dumps(match, sort_keys=True))
+            duration = stat.duration_sec + stat.duration_nsec / 1e9
+            entry = {
+                'table_id': stat.table_id,
+                'priority': stat.priority,
+                'match': match,
+                'actions': actions_to_str(stat.instructions),
+                'packet_count': stat.packet_count,
+                'byte_count': stat.byte_count,
+                'duration_sec': stat.duration_sec,
+                '_duration': duration
+            }
+            prev = previous.get(key)
+            if prev and duration > prev['_duration']:
+                entry['byte_rate'] = (stat.byte_count - prev['byte_count']) / (duration - prev['_duration'])
+            current[key] = entry
+        self.flows[dpid] = current
+
+    def _snapshot(self):
+        return {
+            'time': time.time(),
+            'dpids': sorted(self.datapaths),
+            'ports': {str(dpid): list(ports.values()) for dpid, ports in self.ports.items()},
+            'flows': {str(dpid): [{k: v for k, v in flow.items() if k != '_duration'} for flow in flows.values()]
+                      for dpid, flows in self.flows.items()}
+        }
+
+    def _publish(self):
+        if not self.subscribers:
+            return
+        line = (json.dumps(self._snapshot(), separators=(',', ':')) + "\n").encode()
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber['queue'].put_nowait(line)
+            except Full:
+                self.logger.warning("Dropping stats subscriber: more than %d snapshots behind", MAX_QUEUED)
+                self._drop(subscriber)
@@ -0,0 +1,164 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_PATH = os.environ.get(
+    'BANDWIDTH_MATRIX_SHM',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'bandwidth_matrix'))
+
+MAGIC = b'BWMATRX1'
+RETIRED = b'RETIRED\0'
+# magic, seq, node count, names capacity, names length, timestamp
+HEADER = struct.Struct('<8sQQQQd')
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+
+
+def _layout(n, names_cap):
+    """Byte offsets of the capacity and usage matrices and the total segment size"""
+    capacity_at = (HEADER.size + names_cap + 7) // 8 * 8
+    usage_at = capacity_at + n * n * 8
+    return capacity_at, usage_at, usage_at + n * n * 8
+
+
+class BandwidthMatrixWriter:
+    """Publishes the live link capacity/usage matrices into a memory-mapped file.
+
+    The segment holds a header, the node names (JSON) and two n x n float64
+    matrices: link capacity and measured usage in Mbps. Updates use a seqlock:
+    the sequence number is odd while a write is in progress and even once it
+    is complete, so readers can detect and retry a torn read. When the node
+    set no longer fits, a new segment replaces the file and the old one is
+    marked retired so readers reopen the path.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.mm = None
+        self.n = 0
+        self.names_cap = 0
+        self.seq = 0
+
+    def _create(self, n, names_cap):
+        _, _, size = _layout(n, names_cap)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(size)
+        with open(tmp_path, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), size)
+        # Odd until the first publish completes, so readers never see the empty segment
+        HEADER.pack_into(mm, 0, MAGIC, self.seq + 1, n, names_cap, 0, 0.0)
+        os.replace(tmp_path, self.path)
+        if self.mm is not None:
+            self.mm[:len(RETIRED)] = RETIRED
+            self.mm.close()
+        self.mm, self.n, self.names_cap = mm, n, names_cap
+
+    def publish(self, nodes, capacity, usage, timestamp=None):
+        """Write one consistent snapshot; returns its version"""
+        names = json.dumps(list(nodes)).encode()
+        n = len(nodes)
+        if self.mm is None or n != self.n or len(names) > self.names_cap:
+            self._create(n, len(names) * 2 + 64)
+
+        capacity_at, usage_at, _ = _layout(n, self.names_cap)
+        self.seq += 1
+        SEQ.pack_into(self.mm, SEQ_OFFSET, self.seq)
+        self.mm[HEADER.size:HEADER.size + len(names)] = names
+        np.ndarray((n, n), dtype='<f8', buffer=self.mm, offset=capacity_at)[:] = capacity
+        np.ndarray((n, n), dtype='<f8', buffer=self.mm, offset=usage_at)[:] = usage
+        HEADER.pack_into(self.mm, 0, MAGIC, self.seq, n, self.names_cap, len(names), timestamp or time.time())
+        self.seq += 1
+        SEQ.pack_into(self.mm, SEQ_OFFSET, self.seq)
+        return self.seq // 2
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+class BandwidthMatrixReader:
+    """Reads snapshots published by BandwidthMatrixWriter, retrying torn reads"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.mm = None
+
+    def _open(self):
+        self.mm = None
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, n, names_cap, _, _ = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a bandwidth matrix segment")
+        capacity_at, usage_at, _ = _layout(n, names_cap)
+        self.mm = mm
+        self.capacity = np.ndarray((n, n), dtype='<f8', buffer=mm, offset=capacity_at)
+        self.usage = np.ndarray((n, n), dtype='<f8', buffer=mm, offset=usage_at)
+
+    def _current(self):
+        if self.mm is None or self.mm[:len(RETIRED)] == RETIRED:
+            self._open()
+        return SEQ.unpack_from(self.mm, SEQ_OFFSET)[0]
+
+    def version(self):
+        """Version of the latest complete snapshot; cheap enough to poll for cache invalidation"""
+        return self._current() // 2
+
+    def view(self):
+        """(seq, capacity, usage) as live zero-copy arrays; check them afterwards with valid(seq)"""
+        seq = self._current()
+        return seq, self.capacity, self.usage
+
+    def valid(self, seq):
+        """True if no write started or finished since view() returned seq"""
+        return seq % 2 == 0 and SEQ.unpack_from(self.mm, SEQ_OFFSET)[0] == seq
+
+    def read(self, retries=1000):
+        """Consistent copy: {'version', 'time', 'nodes', 'index', 'capacity', 'usage'}"""
+        for _ in range(retries):
+            seq = self._current()
+            if seq % 2:
+                time.sleep(0)
+                continue
+            _, _, _, _, names_len, timestamp = HEADER.unpack_from(self.mm, 0)
+            names = bytes(self.mm[HEADER.size:HEADER.size + names_len])
+            capacity, usage = self.capacity.copy(), self.usage.copy()
+            if not self.valid(seq):
+                continue
+            nodes = json.loads(names) if names else []
+            return {
+                'version': seq // 2,
+                'time': timestamp,
+                'nodes': nodes,
+                'index': {node: i for i, node in enumerate(nodes)},
+                'capacity': capacity,
+                'usage': usage
+            }
+        raise TimeoutError(f"no consistent snapshot of {self.path} after {retries} attempts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the live bandwidth matrix published by the monitor")
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--residual', action='store_true', help='Print capacity minus usage instead of usage')
+    args = parser.parse_args()
+
+    snapshot = BandwidthMatrixReader(args.path).read()
+    matrix = snapshot['capacity'] - snapshot['usage'] if args.residual else snapshot['usage']
+    nodes = snapshot['nodes']
+    print(f"version {snapshot['version']} at {time.strftime('%H:%M:%S', time.localtime(snapshot['time']))}")
+    print(" " * 8 + "".join(f"{node:>8}" for node in nodes))
+    for i, node in enumerate(nodes):
+        print(f"{node:<8}" + "".join(f"{val:8.2f}" for val in matrix[i]))
+
+
+if __name__ == "__main__":
+    main()
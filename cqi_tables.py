@@ -0,0 +1,50 @@
+from bisect import bisect_right
+import numpy as np
+
+# RSSI upper bounds (dBm, exclusive) and the CQI assigned below each bound
+RSSI_THRESHOLDS = np.array([-100, -90, -80, -70, -60, -50], dtype=float)
+CQI_BY_RSSI_BIN = np.array([1, 3, 5, 7, 10, 12, 15], dtype=int)
+
+MIN_CQI = 1
+MAX_CQI = 15
+
+# Measured Mbps per RB at the CQI levels we calibrated; the remaining
+# levels are interpolated so every CQI has an explicit capacity.
+_CALIBRATED_CAPACITY = {0: 0.0, 5: 0.3, 7: 0.6, 9: 0.9, 10: 1.0, 12: 1.2, 15: 1.4}
+
+CQI_RB_CAPACITY = np.interp(
+    np.arange(MAX_CQI + 1),
+    sorted(_CALIBRATED_CAPACITY),
+    [_CALIBRATED_CAPACITY[k] for k in sorted(_CALIBRATED_CAPACITY)]
+)
+
+
+def rssi_to_cqi(rssi):
+    """Map a single RSSI value (dBm) to a CQI level"""
+    return int(CQI_BY_RSSI_BIN[bisect_right(RSSI_THRESHOLDS, rssi)])
+
+
+def rssi_to_cqi_array(rssi):
+    """Map an array of RSSI values (dBm) to CQI levels"""
+    return CQI_BY_RSSI_BIN[np.searchsorted(RSSI_THRESHOLDS, np.asarray(rssi, dtype=float), side='right')]
+
+
+def rb_capacity(cqi_level):
+    """Mbps carried by one RB at the given CQI level"""
+    return float(CQI_RB_CAPACITY[min(max(int(cqi_level), MIN_CQI), MAX_CQI)])
+
+
+def required_rbs(bandwidth_mbps, cqi_level):
+    """Number of RBs needed to carry bandwidth_mbps at cqi_level"""
+    return int((bandwidth_mbps / rb_capacity(cqi_level)) + 0.5)
+
+
+def required_rbs_array(bandwidth_mbps, cqi_levels):
+    """Vectorized required_rbs over arrays of bandwidths and/or CQI levels"""
+    cqi = np.clip(np.asarray(cqi_levels, dtype=int), MIN_CQI, MAX_CQI)
+    return np.floor(np.asarray(bandwidth_mbps, dtype=float) / CQI_RB_CAPACITY[cqi] + 0.5).astype(int)
+
+
+def rssi_to_rbs_array(rssi, bandwidth_mbps):
+    """Vectorized RSSI -> CQI -> required RBs conversion"""
+    return required_rbs_array(bandwidth_mbps, rssi_to_cqi_array(rssi))
@@ -0,0 +1,233 @@
+import re
+import time
+import threading
+from subprocess import PIPE, DEVNULL
+from threading import Lock
+from mininet.log import info, error
+
+
+def wait_with_backoff(check, timeout=5.0, initial_delay=0.005, max_delay=0.25):
+    """Poll check() with exponential backoff until it is truthy or timeout expires"""
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        if check():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def _run(host, args):
+    """Run a command in the host's namespace without its shell, so it is safe from any thread"""
+    proc = host.popen(args, stdout=PIPE, stderr=DEVNULL)
+    out, _ = proc.communicate()
+    return out.decode() if isinstance(out, bytes) else out
+
+
+def listening_ports(host):
+    """Return the set of TCP ports in LISTEN state inside the host's namespace"""
+    ports = set()
+    for line in _run(host, ['ss', '-Hltn']).splitlines():
+        parts = line.split()
+        if len(parts) < 4:
+            continue
+        port = parts[3].rsplit(':', 1)[-1]
+        if port.isdigit():
+            ports.add(int(port))
+    return ports
+
+
+def pidfile(host_name, port):
+    """Per (host, port) pidfile; hosts share one PID namespace, so pkill by pattern would hit every host"""
+    return f"/tmp/iperf3_{host_name}_{port}.pid"
+
+
+def kill_server(host, port):
+    """Shell snippet stopping the pooled daemon for host:port, if one was started"""
+    path = pidfile(host.name, port)
+    return f"[ -f {path} ] && kill $(cat {path}) 2>/dev/null; rm -f {path}"
+
+
+def client_pattern(server_ip, port):
+    """pkill/pgrep -f pattern for an iperf3 client of server_ip:port, TCP or UDP"""
+    return f"iperf3 -c {re.escape(server_ip)} .*-p {port}( |$)"
+
+
+def client_running(host, server_ip, port):
+    return host.popen(['pgrep', '-f', client_pattern(server_ip, port)],
+                      stdout=DEVNULL, stderr=DEVNULL).wait() == 0
+
+
+class ServerReadiness:
+    """Readiness events for iperf3 servers, keyed by (server_ip, port)"""
+
+    def __init__(self):
+        self._events = {}
+        self._lock = Lock()
+
+    def event(self, server_ip, port):
+        with self._lock:
+            return self._events.setdefault((server_ip, int(port)), threading.Event())
+
+    def mark_ready(self, server_ip, port):
+        self.event(server_ip, port).set()
+
+    def is_ready(self, server_ip, port):
+        return self.event(server_ip, port).is_set()
+
+    def wait(self, server_ip, port, timeout=10):
+        return self.event(server_ip, port).wait(timeout)
+
+    def wait_all(self, timeout=10):
+        """Wait until every known server is ready; return the (ip, port) pairs still pending"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            events = dict(self._events)
+        for key, event in events.items():
+            event.wait(max(0, deadline - time.monotonic()))
+        return [key for key, event in events.items() if not event.is_set()]
+
+    def watch(self, host, server_ip, ports, timeout=10):
+        """Probe the host in the background and mark each port ready once it is listening"""
+        pending = {int(p) for p in ports}
+        for port in pending:
+            self.event(server_ip, port)
+
+        def probe():
+            listening = listening_ports(host)
+            for port in pending & listening:
+                self.mark_ready(server_ip, port)
+            pending.difference_update(listening)
+            return not pending
+
+        def run():
+            if not wait_with_backoff(probe, timeout=timeout):
+                error(f"[READY] iperf3 on {host.name} not listening on ports {sorted(pending)}\n")
+            else:
+                info(f"[READY] iperf3 on {host.name} ({server_ip}) listening on {sorted(ports)}\n")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+class IperfServerPool:
+    """Long-lived iperf3 daemons per host, kept warm across test runs.
+
+    Servers are only (re)started when a cheap `ss` health check shows the port
+    is not listening; releasing a port marks it free without stopping it. A
+    port still held stale_after seconds past the hold time given to acquire()
+    is taken to belong to a run that died, and can be reserved again. Each
+    daemon writes a pidfile so it can be stopped without touching other hosts.
+    """
+
+    def __init__(self, base_port=5201, readiness=None, stale_after=60.0):
+        self.base_port = base_port
+        self.stale_after = stale_after
+        self.readiness = readiness or ServerReadiness()
+        self._servers = {}
+        self._lock = Lock()
+
+    def _start(self, host, server_ip, ports):
+        """Start daemons for the given ports in one shell round trip and watch for readiness"""
+        for port in ports:
+            self.readiness.event(server_ip, port).clear()
+        host.cmd("; ".join(f"{kill_server(host, port)}; iperf3 -s -p {port} -D --pidfile {pidfile(host.name, port)}"
+                           for port in ports))
+        return self.readiness.watch(host, server_ip, ports)
+
+    def ensure(self, host, server_ip, ports):
+        """Make sure iperf3 listens on every port, restarting only the dead ones"""
+        ports = {int(p) for p in ports}
+        listening = listening_ports(host)
+        with self._lock:
+            for port in ports:
+                entry = self._servers.setdefault((host.name, port), {
+                    'host': host, 'ip': server_ip, 'in_use': False, 'starts': 0})
+                if port not in listening:
+                    entry['starts'] += 1
+
+        for port in ports & listening:
+            self.readiness.mark_ready(server_ip, port)
+
+        dead = sorted(ports - listening)
+        if dead:
+            info(f"[POOL] Starting iperf3 on {host.name} ports {dead}\n")
+            return self._start(host, server_ip, dead)
+        return None
+
+    def _busy(self, entry, port, holder_gone=False):
+        """True while a port is held, until its hold time plus stale_after has passed"""
+        if not entry['in_use']:
+            return False
+        held = time.monotonic() - entry['since']
+        hold = 0.0 if holder_gone else entry['hold']
+        if hold is None or held < hold + self.stale_after:
+            return True
+        info(f"[POOL] Reclaiming {entry['host'].name}:{port} - held {held:.0f}s, expected {hold:.0f}s\n")
+        return False
+
+    def _reserve(self, host, server_ip, port, hold, holder_gone):
+        """Mark (host, port) in use; the requested port or the first free one. Caller holds the lock"""
+        if port is None:
+            port = self.base_port
+            while (host.name, port) in self._servers and self._busy(self._servers[(host.name, port)], port):
+                port += 1
+        entry = self._servers.setdefault((host.name, int(port)), {
+            'host': host, 'ip': server_ip, 'in_use': False, 'starts': 0})
+        if self._busy(entry, int(port), holder_gone):
+            return None
+        entry.update(in_use=True, since=time.monotonic(), hold=hold)
+        return int(port)
+
+    def acquire(self, host, server_ip, ports, hold=None, holder_gone=False):
+        """Reserve ports on the host (None entries get the first free port) and make sure they are served.
+
+        hold is how long the caller expects to use them (None: until released).
+        Ports already in use by another run are skipped, unless that run held
+        them longer than its hold plus stale_after. With holder_gone the caller
+        has seen the previous holder's client exit, so only stale_after applies.
+        """
+        with self._lock:
+            reserved = [self._reserve(host, server_ip, port, hold, holder_gone and port is not None)
+                        for port in ports]
+        reserved = [port for port in reserved if port is not None]
+        if reserved:
+            self.ensure(host, server_ip, reserved)
+        return reserved
+
+    def release(self, host_name, port):
+        """Mark a port free again; the daemon keeps running"""
+        with self._lock:
+            entry = self._servers.get((host_name, int(port)))
+            if entry:
+                entry['in_use'] = False
+
+    def health_check(self):
+        """One `ss` per host; restart servers that are no longer listening"""
+        by_host = {}
+        with self._lock:
+            for (host_name, port), entry in self._servers.items():
+                by_host.setdefault(host_name, (entry['host'], entry['ip'], []))[2].append(port)
+        for host, server_ip, ports in by_host.values():
+            self.ensure(host, server_ip, ports)
+
+    def shutdown(self, host_name=None):
+        """Stop pooled daemons (all hosts, or only host_name)"""
+        with self._lock:
+            keys = [key for key in self._servers if host_name in (None, key[0])]
+            entries = [(key, self._servers.pop(key)) for key in keys]
+        for (name, port), entry in entries:
+            entry['host'].cmd(kill_server(entry['host'], port))
+            self.readiness.event(entry['ip'], port).clear()
+
+
+def get_server_pool(net):
+    """Return the iperf3 server pool attached to the network, creating it on first use"""
+    pool = getattr(net, 'iperf_pool', None)
+    if pool is None:
+        pool = net.iperf_pool = IperfServerPool()
+    return pool
@@ -1,21 +1,31 @@
 import csv
 import json
-import statistics
 import time
 import os
 import threading
 from mininet.log import info, error
 from wifi_test import run_concurrent_tests
+from rssi_estimator import RSSIEstimator
+from path_engine import PathEngine
+from iperf_servers import get_server_pool, client_running, client_pattern
+from node_index import get_node_index
+from video_kpi import NetDevSampler, kpi_summary, COLUMNS, TIME, RX_BYTES, RX_DROPPED, JITTER, LOSS_RATE
 
 class NetworkTester:
-    def __init__(self, net):
+    def __init__(self, net, use_rssi_model=True, stream_iperf=False, min_throughput_ratio=None,
+                 check_backhaul=True, verify_scan=False):
         self.net = net
-        self.host_ips = {
-            'h0': '10.0.0.1', 'h1': '10.0.0.2', 'h2': '10.0.0.3', 'h3': '10.0.0.4',
-            'h4': '10.0.0.8', 'h5': '10.0.0.5', 'h6': '10.0.0.6', 'h7': '10.0.0.7',
-            'h8': '10.0.0.9', 'h9': '10.0.0.10', 'h10': '10.0.0.11',
-            'sta1': '10.0.0.101', 'sta2': '10.0.0.102', 'sta3': '10.0.0.103'
-        }
+        # Confirm the estimated AP choice with a real scan before reserving RBs
+        self.verify_scan = verify_scan
+        self.use_rssi_model = use_rssi_model
+        self.stream_iperf = stream_iperf
+        self.min_throughput_ratio = min_throughput_ratio
+        self.pool = get_server_pool(net)
+        self.readiness = self.pool.readiness
+        self.nodes = get_node_index(net)
+        # (src, dst, dst_ip, port) of the background flows this tester started or adopted
+        self.background = []
+        self.path_engine = PathEngine.from_net(net) if check_backhaul else None
     
     def format_timestamp(self, timestamp):
         """Convert timestamp to readable format: YYYY-MM-DD HH:MM:SS.microseconds"""
@@ -31,81 +41,44 @@ class NetworkTester:
         except:
             return str(timestamp)
         
-    def monitor_video_quality(self, duration=60):
-        results = {'video_quality': [], 'start_time': time.time()}
+    def monitor_video_quality(self, duration=60, rate_hz=20):
         h0 = self.net.get('h0')
-        
-        def collect():
-            prev_rx, prev_time = None, None
-            arrival_times = []
-            
-            for _ in range(duration // 5):
-                timestamp = time.time()
-                output = h0.cmd('cat /proc/net/dev | grep h0-eth0')
-                
-                if output:
-                    parts = output.strip().split()
-                    if len(parts) >= 10:
-                        rx_bytes, rx_packets = int(parts[1]), int(parts[2])
-                        rx_errs, rx_drop = int(parts[3]), int(parts[4])
-                        loss_rate = (rx_errs + rx_drop) / max(rx_packets, 1) * 100
-                        
-                        if rx_packets > 0 and not results.get('first_packet_time'):
-                            results['first_packet_time'] = timestamp
-                            
-                        jitter = None
-                        if prev_rx and prev_time and rx_packets > prev_rx:
-                            arrival_times.append(timestamp)
-                            if len(arrival_times) >= 3:
-                                diffs = [arrival_times[i] - arrival_times[i-1] for i in range(1, len(arrival_times))]
-                                jitter = statistics.stdev(diffs[-10:]) if len(diffs) > 1 else 0
-                        
-                        results['video_quality'].append({
-                            'timestamp': self.format_timestamp(timestamp),
-                            'rx_bytes': rx_bytes, 'rx_packets': rx_packets,
-                            'rx_errors': rx_errs, 'rx_dropped': rx_drop,
-                            'packet_loss_rate': loss_rate, 'jitter': jitter
-                        })
-                        
-                        prev_rx, prev_time = rx_packets, timestamp
-                time.sleep(5)
-        
-        thread = threading.Thread(target=collect, daemon=True)
-        thread.start()
+        sampler = NetDevSampler(h0, 'h0-eth0', duration=duration, rate_hz=rate_hz)
+        results = {'sampler': sampler, 'start_time': time.time()}
+        thread = sampler.start()
         return thread, results
     
-    def analyze_video_quality(self, results):
-        data = results['video_quality']
-        if len(data) < 3:
-            return None
-        packet_times = []
-        for entry in data:
-            if entry['rx_packets'] > 0:
+    def start_packet_probe(self, duration=60, port=1234):
+        """Run video_probe.py on h0 and collect its per-second packet KPIs"""
+        h0 = self.net.get('h0')
+        probe_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'video_probe.py')
+        proc = h0.popen(['python3', probe_path, '--intf', 'h0-eth0', '--port', str(port),
+                         '--duration', str(duration)])
+        kpis = []
+
+        def collect():
+            for line in iter(proc.stdout.readline, b''):
                 try:
-                    ts_str = entry['timestamp']
-                    if '.' in ts_str:
-                        dt_part, micro_part = ts_str.split('.')
-                        dt = time.strptime(dt_part, "%Y-%m-%d %H:%M:%S")
-                        ts = time.mktime(dt) + float('0.' + micro_part)
-                    else:
-                        dt = time.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-                        ts = time.mktime(dt)
-                    packet_times.append(ts)
-                except:
+                    kpis.append(json.loads(line))
+                except ValueError:
                     continue
-                    
-        if len(packet_times) < 3:
+            proc.wait()
+
+        thread = threading.Thread(target=collect, daemon=True)
+        thread.start()
+        return thread, kpis
+
+    def analyze_video_quality(self, results):
+        sampler = results['sampler']
+        summary = kpi_summary(sampler.data())
+        if summary is None:
             return None
-            
-        inter_times = [packet_times[i] - packet_times[i-1] for i in range(1, len(packet_times))]
-        rfc3550_jitter = 0
-        for i in range(1, len(inter_times)):
-            d = abs(inter_times[i] - inter_times[i-1])
-            rfc3550_jitter = rfc3550_jitter + (d - rfc3550_jitter) / 16
-        
-        quality = "Excellent" if rfc3550_jitter < 0.020 else "Good" if rfc3550_jitter < 0.050 else "Fair" if rfc3550_jitter < 0.100 else "Poor"
-        
-        return {'rfc3550_jitter': rfc3550_jitter, 'quality': quality}
+
+        jitter = summary['rfc3550_jitter']
+        summary['quality'] = "Excellent" if jitter < 0.020 else "Good" if jitter < 0.050 else "Fair" if jitter < 0.100 else "Poor"
+        if summary['first_packet_time'] is not None:
+            summary['first_packet_time'] = sampler.wall_time(summary['first_packet_time'])
+        return summary
     
     def setup_video_stream(self):
         sta1, h0 = self.net.get('sta1'), self.net.get('h0')
@@ -122,23 +95,27 @@ class NetworkTester:
         h0.cmd("sudo -u wifi cvlc udp://@:1234 --network-caching=1500 --sout file/ts:/tmp/sta1_to_h0_video.ts --run-time=180 --play-and-exit > /tmp/vlc_recv_sta1.log 2>&1 &")
 
         time.sleep(5)
-        sta1.cmd("sudo -u wifi cvlc --intf dummy /home/wifi/test-video/HD_fixed.mp4 --sout '#udp{dst=10.0.0.1:1234}' --sout-ffmpeg-strict=-2 --play-and-exit > /tmp/vlc_send_sta1.log 2>&1 &")
+        h0_ip = self.nodes.ip_of('h0') or '10.0.0.1'
+        sta1.cmd(f"sudo -u wifi cvlc --intf dummy /home/wifi/test-video/HD_fixed.mp4 --sout '#udp{{dst={h0_ip}:1234}}' --sout-ffmpeg-strict=-2 --play-and-exit > /tmp/vlc_send_sta1.log 2>&1 &")
 
         return True
     
     def start_servers(self, scenarios):
-        server_map = {}
+        """Reserve pooled iperf3 servers and return readiness events that fire once each port listens"""
+        ports_by_host = {}
         for scenario in scenarios:
             server_ip, port = scenario['server_ip'], scenario.get('port', 5201)
-            for host, ip in self.host_ips.items():
-                if ip == server_ip and (host, port) not in server_map:
-                    host_obj = self.net.get(host)
-                    if host_obj:
-                        host_obj.cmd(f"pkill -f 'iperf3 -s -p {port}'")
-                        time.sleep(0.5)
-                        result = host_obj.cmd(f"iperf3 -s -p {port} -D")
-                        if "error" not in result.lower():
-                            server_map[(host, port)] = True
+            host_obj = self.nodes.node_for_ip(server_ip)
+            if host_obj:
+                ports_by_host.setdefault((host_obj, server_ip), set()).add(port)
+            else:
+                error(f"No node owns server IP {server_ip}\n")
+
+        # Upper bound on how long the run keeps them: every scenario back to back, up to its deadline
+        hold = sum(scenario['duration_seconds'] + 30 for scenario in scenarios)
+        for (host_obj, server_ip), ports in ports_by_host.items():
+            self.pool.acquire(host_obj, server_ip, sorted(ports), hold=hold)
+        return self.readiness
                             
     def inject_background_traffic(self):
         flows = [("h8", "h4", "20M"),
@@ -146,10 +123,22 @@ class NetworkTester:
         
         for i, (src, dst, bw) in enumerate(flows, 4000):
             src_host, dst_host = self.net.get(src), self.net.get(dst)
-            dst_ip = self.host_ips.get(dst)
+            dst_ip = self.nodes.ip_of(dst)
             if src_host and dst_host and dst_ip:
-                dst_host.cmd(f"pkill -f 'iperf3 -s -p {i}'; iperf3 -s -p {i} -D")
-                time.sleep(1)
+                running = client_running(src_host, dst_ip, i)
+                reserved = self.pool.acquire(dst_host, dst_ip, [i], holder_gone=not running)
+                if running:
+                    info(f"Background flow {src} -> {dst}:{i} already running\n")
+                    if reserved:
+                        self.background.append((src, dst, dst_ip, i))
+                    continue
+                if not reserved:
+                    error(f"Background port {dst}:{i} is in use by another run\n")
+                    continue
+                self.background.append((src, dst, dst_ip, i))
+                if not self.readiness.wait(dst_ip, i, timeout=5):
+                    error(f"Background iperf3 server on {dst}:{i} did not start\n")
+                    continue
                 src_host.cmd(f"iperf3 -c {dst_ip} -p {i} -b {bw} -t 9999 > /dev/null 2>&1 &")
                 
     def create_test_scenarios(self):
@@ -168,20 +157,25 @@ class NetworkTester:
                 scenarios.append({
                     'station': station, 'server_ip': server_ip,
                     'bandwidth_mbps': bw, 'duration_seconds': duration,
-                    'protocol': 'tcp', 'port': port
+                    'protocol': 'tcp', 'port': port,
+                    'stream': self.stream_iperf, 'min_throughput_ratio': self.min_throughput_ratio
                 })
         return scenarios
     
-    def cleanup_servers(self, scenarios):
-        cleaned = set()
+    def cleanup_servers(self, scenarios, shutdown=False):
+        """Return scenario and background ports to the pool; daemons and flows stay up unless shutdown=True"""
         for scenario in scenarios:
             server_ip, port = scenario['server_ip'], scenario.get('port', 5201)
-            for host, ip in self.host_ips.items():
-                if ip == server_ip and (host, port) not in cleaned:
-                    host_obj = self.net.get(host)
-                    if host_obj:
-                        host_obj.cmd(f"pkill -f 'iperf3 -s -p {port}'")
-                        cleaned.add((host, port))
+            host = self.nodes.name_for_ip(server_ip)
+            if host:
+                self.pool.release(host, port)
+        for src, dst, dst_ip, port in self.background:
+            self.pool.release(dst, port)
+            if shutdown:
+                self.net.get(src).popen(['pkill', '-f', client_pattern(dst_ip, port)]).wait()
+        self.background = []
+        if shutdown:
+            self.pool.shutdown()
     
     def save_results(self, results, video_results=None, output_dir="network_test_results"):
         timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -205,14 +199,23 @@ class NetworkTester:
                     
                     writer.writerow(formatted_row)
         
-        if video_results and video_results.get('video_quality'):
-            with open(f"{output_dir}/video_kpis_{timestamp}.csv", "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    "timestamp", "rx_bytes", "rx_packets", "rx_errors", 
-                    "rx_dropped", "packet_loss_rate", "jitter"
-                ])
+        packet_kpis = video_results.get('packet_kpis') if video_results else None
+        if packet_kpis:
+            with open(f"{output_dir}/video_packet_kpis_{timestamp}.csv", "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(packet_kpis[0].keys()))
                 writer.writeheader()
-                writer.writerows(video_results['video_quality']) 
+                for row in packet_kpis:
+                    writer.writerow({**row, 'time': self.format_timestamp(row['time'])})
+
+        sampler = video_results.get('sampler') if video_results else None
+        if sampler is not None and sampler.count:
+            with open(f"{output_dir}/video_kpis_{timestamp}.csv", "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["timestamp"] + list(COLUMNS[1:]))
+                for row in sampler.data():
+                    writer.writerow([self.format_timestamp(sampler.wall_time(row[TIME]))] +
+                                    [int(v) for v in row[RX_BYTES:RX_DROPPED + 1]] +
+                                    [row[LOSS_RATE], row[JITTER]])
     
     def print_summary(self, test_results, video_results):
         successful = [r for r in test_results if r.get('success', False)]
@@ -221,15 +224,17 @@ class NetworkTester:
         for i, test in enumerate(successful):
             print(f"{i+1}. {test.get('station', 'Unknown')} -> {test.get('selected_ap', 'Unknown')}: {test.get('avg_mbps', 0):.1f} Mbps")
         
-        data = video_results['video_quality']
-        if len(data) >= 2:
-            total_packets = data[-1]['rx_packets'] - data[0]['rx_packets']
-            duration = time.time() - video_results['start_time']
-            print(f"\n[VIDEO] Packets: {total_packets}, Duration: {duration:.1f}s")
-            
-            enhanced_metrics = self.analyze_video_quality(video_results)
-            if enhanced_metrics:
-                print(f"Video Quality: {enhanced_metrics['quality']} (Jitter: {enhanced_metrics['rfc3550_jitter']:.6f}s)")
+        packet_kpis = video_results.get('packet_kpis')
+        if packet_kpis:
+            last = packet_kpis[-1]
+            print(f"\n[VIDEO/PACKETS] Mode: {last['mode']}, Packets: {last['total_packets']}, "
+                  f"Jitter: {last['jitter_ms']:.3f} ms, Loss: {last['total_loss_percent']:.2f}%")
+
+        enhanced_metrics = self.analyze_video_quality(video_results)
+        if enhanced_metrics:
+            print(f"\n[VIDEO] Packets: {enhanced_metrics['packets']}, Duration: {enhanced_metrics['duration']:.1f}s")
+            print(f"Video Quality: {enhanced_metrics['quality']} (Jitter: {enhanced_metrics['rfc3550_jitter']:.6f}s, "
+                  f"Loss: {enhanced_metrics['packet_loss_rate']:.2f}%)")
     
     def run_test(self):
         scenarios = self.create_test_scenarios()
@@ -237,19 +242,25 @@ class NetworkTester:
         
         print("Starting network test - setting up servers")
         self.start_servers(scenarios)
-        time.sleep(5)
-        
-        print("Injecting background traffic")
-        self.inject_background_traffic()
-        time.sleep(10)
-        
-        print("Starting video stream")
-        self.setup_video_stream()
-        monitor_thread, video_results = self.monitor_video_quality(60)
-        
         try:
+            not_ready = self.readiness.wait_all(timeout=10)
+            if not_ready:
+                print(f"iperf3 servers not ready: {not_ready}")
+
+            print("Injecting background traffic")
+            self.inject_background_traffic()
+            time.sleep(10)
+
+            print("Starting video stream")
+            self.setup_video_stream()
+            monitor_thread, video_results = self.monitor_video_quality(60)
+            probe_thread, video_results['packet_kpis'] = self.start_packet_probe(60)
+
             print("Running concurrent tests")
-            test_results = run_concurrent_tests(scenarios, aps, self.net)
+            estimator = RSSIEstimator.from_net(self.net, aps) if self.use_rssi_model else None
+            test_results = run_concurrent_tests(scenarios, aps, self.net, estimator=estimator,
+                                                readiness=self.readiness, path_engine=self.path_engine,
+                                                verify_scan=self.verify_scan)
             self.print_summary(test_results, video_results)
             self.save_results(test_results, video_results)
             
@@ -3,6 +3,7 @@ import os
 import json
 import numpy as np
 import csv
+from topology_spec import node_types
 
 
 def is_valid_node(name):
@@ -10,19 +11,24 @@ def is_valid_node(name):
     return ((name.startswith('s')) or name.startswith('ap')) and not name.startswith('sta')
 
 
-def save_topology_to_file(net, filename="topology.json"):
+def save_topology_to_file(net, filename="topology.json", spec=None):
     """Save network topology to JSON file and generate adjacency matrix"""
     info("[*] Saving topology to JSON file...\n")
-    
+
+    # Classify nodes from the topology spec when there is one, by name otherwise
+    spec = spec or getattr(net, 'topology_spec', None)
+    types = node_types(spec) if spec else {}
+    valid = (lambda name: types.get(name) in ('switch', 'ap')) if types else is_valid_node
+
     # Get valid switches and APs
-    switches_and_aps = sorted([name for name in net.keys() if is_valid_node(name)])
+    switches_and_aps = sorted([name for name in net.keys() if valid(name)])
     
     # Extract links
     links = []
     seen_links = set()
 
     for name, node in net.items():
-        if not is_valid_node(name) or not hasattr(node, 'intfs'):
+        if not valid(name) or not hasattr(node, 'intfs'):
             continue
             
         for intf in node.intfs.values():
@@ -40,7 +46,7 @@ def save_topology_to_file(net, filename="topology.json"):
                 dst_node = link.intf2.node.name if hasattr(link.intf2, 'node') else None
                 
                 if not (src_node and dst_node and 
-                       is_valid_node(src_node) and is_valid_node(dst_node)):
+                       valid(src_node) and valid(dst_node)):
                     continue
                     
             except AttributeError as e:
@@ -69,7 +75,11 @@ def save_topology_to_file(net, filename="topology.json"):
             
     info(f"Found {len(switches_and_aps)} switches/APs and {len(links)} links between them (stations excluded)\n")
     
-    topology = {"nodes": switches_and_aps, "links": links}
+    # DPIDs as read back from OVS by Topology.py, so monitors can name devices without guessing
+    dpids = {name: net.get(name).dpid for name in switches_and_aps if getattr(net.get(name), 'dpid', None)}
+    topology = {"nodes": switches_and_aps, "links": links, "dpids": dpids}
+    if types:
+        topology["node_types"] = {name: types[name] for name in switches_and_aps}
     
     # Save topology file
     filepath = os.path.join(os.getcwd(), filename)
@@ -93,7 +103,9 @@ def save_adjacency_matrix(topology, port_stats=None):
     """Generate and save adjacency matrix for switches and APs only"""
     info("[*] Generating adjacency matrix for switches and access points only (NO STATIONS)...\n")
     
-    nodes = sorted([node for node in topology["nodes"] if is_valid_node(node)])
+    types = topology.get("node_types")
+    valid = (lambda name: types.get(name) in ('switch', 'ap')) if types else is_valid_node
+    nodes = sorted([node for node in topology["nodes"] if valid(node)])
     info(f"Nodes in matrix (NO STATIONS): {nodes}\n")
     
     node_index = {node: idx for idx, node in enumerate(nodes)}
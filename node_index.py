@@ -0,0 +1,44 @@
+class NodeIndex:
+    """IP <-> node lookups built once from the running network"""
+
+    def __init__(self, net):
+        self.net = net
+        self.by_ip = {}
+        self.ip_by_name = {}
+        self.refresh()
+
+    def _nodes(self):
+        return list(getattr(self.net, 'hosts', [])) + list(getattr(self.net, 'stations', []))
+
+    def refresh(self):
+        """Rebuild the index from the IPs currently configured on hosts and stations"""
+        self.by_ip.clear()
+        self.ip_by_name.clear()
+        for node in self._nodes():
+            primary = node.IP()
+            if primary:
+                self.ip_by_name[node.name] = primary
+                self.by_ip.setdefault(primary, node)
+            for intf in node.intfList():
+                ip = intf.IP() if hasattr(intf, 'IP') else None
+                if ip:
+                    self.by_ip.setdefault(ip, node)
+        return self
+
+    def node_for_ip(self, ip):
+        return self.by_ip.get(ip)
+
+    def name_for_ip(self, ip):
+        node = self.by_ip.get(ip)
+        return node.name if node else None
+
+    def ip_of(self, name):
+        return self.ip_by_name.get(name)
+
+
+def get_node_index(net):
+    """Return the node index attached to the network, building it on first use"""
+    index = getattr(net, 'node_index', None)
+    if index is None:
+        index = net.node_index = NodeIndex(net)
+    return index
@@ -0,0 +1,163 @@
+import heapq
+import threading
+from collections import defaultdict
+from mininet.log import info, error
+import bandwidth_shm
+import topology_spec
+
+
+def _edge(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+class PathEngine:
+    """Widest (max residual bandwidth) paths over the wired topology.
+
+    Link capacities come from the topology spec. Measured usage comes from
+    the matrix the monitor publishes through bandwidth_shm. Links whose
+    capacity drops out of that matrix are treated as down. Admissions made
+    through reserve() are booked on their path until release(). A booked
+    link is charged max(measured usage, usage when first booked + bookings).
+    Once an admitted test's traffic shows up in the matrix, it is therefore
+    not counted a second time. Results are cached per source and recomputed
+    only when a residual capacity actually changes. A repeated query then
+    costs a dict lookup plus a read of the matrix version.
+
+    Hosts are path endpoints, not transit nodes, unless transit_hosts is set.
+    This leaves out the s0-h9-s1 and s2-h10-s4 links of the default topology:
+    Topology.py enables neither IP forwarding nor bridging on h9 or h10, so
+    no traffic crosses them.
+    """
+
+    def __init__(self, spec, matrix_path=bandwidth_shm.DEFAULT_PATH, transit_hosts=False):
+        types = topology_spec.node_types(spec)
+        self.links = [(link['src'], link['dst'], float(link.get('bw', 100)))
+                      for link in topology_spec.links(spec)
+                      if types.get(link['src']) != 'station' and types.get(link['dst']) != 'station']
+        self.transit = {node for node, kind in types.items()
+                        if kind in ('switch', 'ap') or (transit_hosts and kind == 'host')}
+        self.reader = bandwidth_shm.BandwidthMatrixReader(matrix_path) if matrix_path else None
+        self.lock = threading.Lock()
+        self.matrix_version = None
+        self.matrix_missing = False
+        self.usage = {}
+        self.down = set()
+        self.bookings = defaultdict(float)
+        # Measured usage of a link when it went from no bookings to some
+        self.baseline = {}
+        self.residual = {}
+        self.trees = {}
+        self._rebuild()
+
+    @classmethod
+    def from_net(cls, net, **kwargs):
+        """Build an engine for the topology spec the network was created from"""
+        return cls(getattr(net, 'topology_spec', None) or topology_spec.default_spec(), **kwargs)
+
+    def _refresh(self):
+        """Pick up a new matrix version from the monitor, if there is one"""
+        if self.reader is None:
+            return
+        try:
+            version = self.reader.version()
+            if version == self.matrix_version:
+                return
+            snapshot = self.reader.read()
+        except (OSError, ValueError, TimeoutError) as e:
+            if not self.matrix_missing:
+                error(f"[PATH] No live bandwidth matrix ({e}) - using link capacities only\n")
+                self.matrix_missing = True
+            return
+        self.matrix_missing = False
+        self.matrix_version = version
+
+        index, capacity, usage = snapshot['index'], snapshot['capacity'], snapshot['usage']
+        self.usage, self.down = {}, set()
+        for a, b, _ in self.links:
+            if a in index and b in index:
+                i, j = index[a], index[b]
+                if capacity[i][j] <= 0:
+                    self.down.add(_edge(a, b))
+                else:
+                    self.usage[_edge(a, b)] = float(usage[i][j])
+        self._rebuild()
+
+    def _rebuild(self):
+        """Recompute residual capacities; drop cached trees only if any of them changed"""
+        residual = defaultdict(dict)
+        for a, b, bw in self.links:
+            edge = _edge(a, b)
+            if edge in self.down:
+                continue
+            used = self.usage.get(edge, 0.0)
+            if edge in self.bookings:
+                used = max(used, self.baseline[edge] + self.bookings[edge])
+            residual[a][b] = residual[b][a] = max(0.0, bw - used)
+        if residual != self.residual:
+            self.residual = residual
+            self.trees.clear()
+
+    def _tree(self, source):
+        """Widest-path Dijkstra from source: (bottleneck Mbps, parent) per reachable node"""
+        width, parent = {source: float('inf')}, {source: None}
+        heap, done = [(-width[source], source)], set()
+        while heap:
+            w, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            if node != source and node not in self.transit:
+                continue
+            for neighbour, residual in self.residual.get(node, {}).items():
+                bottleneck = min(-w, residual)
+                if bottleneck > width.get(neighbour, -1.0):
+                    width[neighbour], parent[neighbour] = bottleneck, node
+                    heapq.heappush(heap, (-bottleneck, neighbour))
+        return width, parent
+
+    def _widest(self, src, dst):
+        self._refresh()
+        tree = self.trees.get(src)
+        if tree is None:
+            tree = self.trees[src] = self._tree(src)
+        width, parent = tree
+        if dst not in width:
+            return 0.0, None
+        path, node = [], dst
+        while node is not None:
+            path.append(node)
+            node = parent[node]
+        return width[dst], path[::-1]
+
+    def widest_path(self, src, dst):
+        """(bottleneck Mbps, [src, ..., dst]) of the widest path, or (0.0, None) if unreachable"""
+        with self.lock:
+            return self._widest(src, dst)
+
+    def capacity(self, src, dst):
+        return self.widest_path(src, dst)[0]
+
+    def reserve(self, src, dst, mbps):
+        """Book mbps on the widest path if it can carry it; returns the path or None"""
+        with self.lock:
+            width, path = self._widest(src, dst)
+            if path is None or width < mbps:
+                return None
+            for a, b in zip(path, path[1:]):
+                edge = _edge(a, b)
+                if edge not in self.bookings:
+                    self.baseline[edge] = self.usage.get(edge, 0.0)
+                self.bookings[edge] += mbps
+            self._rebuild()
+            info(f"[PATH] Reserved {mbps} Mbps on {' -> '.join(path)} (bottleneck was {width:.1f} Mbps)\n")
+            return path
+
+    def release(self, path, mbps):
+        with self.lock:
+            for a, b in zip(path, path[1:]):
+                edge = _edge(a, b)
+                self.bookings[edge] -= mbps
+                if self.bookings[edge] <= 1e-9:
+                    del self.bookings[edge]
+                    del self.baseline[edge]
+            self._rebuild()
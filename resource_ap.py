@@ -6,6 +6,7 @@ from datetime import datetime
 from mn_wifi.node import OVSKernelAP
 from mininet.link import TCLink
 from mininet.log import info, error
+from cqi_tables import required_rbs
 
 active_links = []
 test_results_log = []
@@ -159,9 +160,7 @@ class ResourceAP(OVSKernelAP):
 
     def estimate_required_rbs(self, bandwidth_mbps, cqi_level=10):
         """Estimate required RBs based on bandwidth and CQI"""
-        cqi_capacity = {5: 0.3, 7: 0.6, 9: 0.9, 10: 1.0, 12: 1.2, 15: 1.4}
-        rb_capacity = cqi_capacity.get(cqi_level, 1.0)
-        return int((bandwidth_mbps / rb_capacity) + 0.5)
+        return required_rbs(bandwidth_mbps, cqi_level)
 
     def _save_json(self, data, filename, description):
         """Helper method to save JSON data"""
@@ -0,0 +1,107 @@
+import math
+import numpy as np
+from mininet.log import info
+from cqi_tables import rssi_to_cqi_array
+
+SPEED_OF_LIGHT = 299792458.0
+DEFAULT_TXPOWER = 14
+DEFAULT_ANTENNA_GAIN = 5
+DEFAULT_FREQ_GHZ = 2.412
+MIN_DISTANCE = 0.1
+
+
+def _node_position(node):
+    """Return the (x, y, z) position of a wifi node"""
+    position = getattr(node, 'position', None)
+    if not position:
+        position = node.params.get('position', '0,0,0')
+    if isinstance(position, str):
+        position = position.split(',')
+    coords = [float(c) for c in position][:3]
+    return coords + [0.0] * (3 - len(coords))
+
+
+def _radio_params(node):
+    """Return (txpower, antenna_gain, freq_ghz) of the node's first wireless interface"""
+    wintfs = getattr(node, 'wintfs', None) or {}
+    intf = wintfs.get(0) if isinstance(wintfs, dict) else (wintfs[0] if wintfs else None)
+    txpower = getattr(intf, 'txpower', None) or node.params.get('txpower', DEFAULT_TXPOWER)
+    gain = getattr(intf, 'antennaGain', None) or node.params.get('antennaGain', DEFAULT_ANTENNA_GAIN)
+    freq = getattr(intf, 'freq', None) or node.params.get('freq', DEFAULT_FREQ_GHZ)
+    return float(txpower), float(gain), float(freq)
+
+
+def reference_path_loss(freq_ghz, system_loss=1, ref_distance=1):
+    """Free space path loss (dB) at the reference distance, as used by logDistance"""
+    wavelength = SPEED_OF_LIGHT / (np.asarray(freq_ghz, dtype=float) * 1e9)
+    return 10 * np.log10(((4 * math.pi * ref_distance) ** 2 * system_loss) / wavelength ** 2)
+
+
+def log_distance_rssi(distances, txpower, tx_gain, rx_gain, freq_ghz, exp=3, system_loss=1):
+    """Vectorized log-distance RSSI (dBm) for an array of distances in meters"""
+    distances = np.maximum(np.asarray(distances, dtype=float), MIN_DISTANCE)
+    pl_ref = np.floor(reference_path_loss(freq_ghz, system_loss))
+    return txpower + tx_gain + rx_gain - (pl_ref + 10 * exp * np.log10(distances))
+
+
+class RSSIEstimator:
+    """Scan-free RSSI estimation from node positions and the log-distance model.
+
+    AP positions and radio parameters are captured once; stations are
+    positioned on every call so mobility is still reflected.
+    """
+
+    def __init__(self, ap_list, exp=3, system_loss=1):
+        self.aps = list(ap_list)
+        self.exp = exp
+        self.system_loss = system_loss
+        self.ap_index = {ap.name: idx for idx, ap in enumerate(self.aps)}
+        self.ap_positions = np.array([_node_position(ap) for ap in self.aps], dtype=float).reshape(-1, 3)
+        radio = np.array([_radio_params(ap) for ap in self.aps], dtype=float).reshape(-1, 3)
+        self.ap_txpower, self.ap_gain, self.ap_freq = radio[:, 0], radio[:, 1], radio[:, 2]
+
+    @classmethod
+    def from_net(cls, net, ap_list=None):
+        """Build an estimator using the propagation model configured on the network"""
+        ap_list = ap_list if ap_list is not None else net.aps
+        try:
+            from mn_wifi.propagationModels import PropagationModel
+            exp = getattr(PropagationModel, 'exp', 3)
+            system_loss = getattr(PropagationModel, 'sL', 1)
+        except (ImportError, AttributeError):
+            exp, system_loss = 3, 1
+        return cls(ap_list, exp=exp, system_loss=system_loss)
+
+    def rssi_matrix(self, stations):
+        """Return the stations x APs RSSI matrix in dBm"""
+        sta_positions = np.array([_node_position(sta) for sta in stations], dtype=float).reshape(-1, 3)
+        sta_gain = np.array([_radio_params(sta)[1] for sta in stations], dtype=float)
+        distances = np.linalg.norm(sta_positions[:, None, :] - self.ap_positions[None, :, :], axis=2)
+        return log_distance_rssi(distances, self.ap_txpower[None, :], self.ap_gain[None, :],
+                                 sta_gain[:, None], self.ap_freq[None, :],
+                                 exp=self.exp, system_loss=self.system_loss)
+
+    def cqi_matrix(self, stations):
+        """Return the stations x APs CQI matrix"""
+        return rssi_to_cqi_array(self.rssi_matrix(stations))
+
+    def rank_aps(self, station, min_rssi_threshold=-90):
+        """Return [(ap, rssi), ...] visible to the station, strongest first"""
+        rssi = self.rssi_matrix([station])[0]
+        order = np.argsort(-rssi, kind='stable')
+        return [(self.aps[i], float(rssi[i])) for i in order if rssi[i] >= min_rssi_threshold]
+
+    def verify_with_scan(self, station, scan_results, tolerance_db=6):
+        """Compare modelled RSSI against a real scan and log deviations above tolerance"""
+        rssi = self.rssi_matrix([station])[0]
+        deviations = {}
+        for ap in self.aps:
+            ssid = ap.params.get('ssid') or f"{ap.name}-ssid"
+            if ssid not in scan_results:
+                continue
+            delta = scan_results[ssid] - float(rssi[self.ap_index[ap.name]])
+            deviations[ap.name] = delta
+            if abs(delta) > tolerance_db:
+                info(f"[RSSI] {station.name}/{ap.name}: model {rssi[self.ap_index[ap.name]]:.1f} dBm "
+                     f"differs from scan {scan_results[ssid]:.1f} dBm by {delta:+.1f} dB\n")
+        return deviations
@@ -0,0 +1,243 @@
+"""Declarative topology specs shared by Topology.py, network_saver.py and the monitors.
+
+A spec is a plain dict (stored as JSON, or YAML when PyYAML is installed):
+
+    {
+      "name": "...",
+      "link_defaults": {"bw": 100},
+      "propagation": {"model": "logDistance", "exp": 3},
+      "plot": {"max_x": 1500, "max_y": 1000},
+      "switches": [{"name": "s0", "dpid": "0000000000000000"}, ...],
+      "aps": [{"name": "ap1", "ssid": "ap1-ssid", "channel": "1", "mode": "g",
+               "position": "337.0,699.0,0"}, ...],
+      "stations": [{"name": "sta1", "ip": "10.0.0.101", "position": "230.0,830.0,0"}, ...],
+      "hosts": [{"name": "h0", "ip": "10.0.0.1"}, ...],
+      "links": [["s1", "s5"], {"src": "s7", "dst": "ap1", "bw": 50}, ...]
+    }
+
+Link order is preserved because it decides the port numbers Mininet assigns.
+"""
+import json
+import os
+import random
+
+
+NODE_SECTIONS = (('switches', 'switch'), ('aps', 'ap'), ('stations', 'station'), ('hosts', 'host'))
+
+
+def _dpid(index):
+    return f"{index:016x}"
+
+
+def default_spec():
+    """The thesis topology: 11 switches, 8 APs, 10 stations and 11 hosts"""
+    ap_positions = ['337.0,699.0,0', '679.0,697.0,0', '1066.0,712.0,0', '1464.0,712.0,0',
+                    '220.0,831.0,0', '573.0,859.0,0', '985.0,880.0,0', '1398.0,877.0,0']
+    sta_positions = ['230.0,830.0,0', '380.0,820.0,0', '680.0,700.0,0', '750.0,730.0,0',
+                     '950.0,730.0,0', '1070.0,820.0,0', '1260.0,790.0,0', '500.0,950.0,0',
+                     '1450.0,730.0,0', '250.0,800.0,0']
+    host_ips = ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4', '10.0.0.8', '10.0.0.5',
+                '10.0.0.6', '10.0.0.7', '10.0.0.9', '10.0.0.10', '10.0.0.11']
+
+    return {
+        'name': 'thesis',
+        'link_defaults': {'bw': 100},
+        'propagation': {'model': 'logDistance', 'exp': 3},
+        'plot': {'max_x': 1500, 'max_y': 1000},
+        'switches': [{'name': f's{i}', 'dpid': _dpid(i)} for i in range(11)],
+        'aps': [{'name': f'ap{i}', 'ssid': f'ap{i}-ssid', 'channel': '1', 'mode': 'g',
+                 'position': pos} for i, pos in enumerate(ap_positions, 1)],
+        'stations': [{'name': f'sta{i}', 'ip': f'10.0.0.{100 + i}', 'position': pos}
+                     for i, pos in enumerate(sta_positions, 1)],
+        'hosts': [{'name': f'h{i}', 'ip': ip} for i, ip in enumerate(host_ips)],
+        'links': [
+            # Switch-to-switch links
+            ['s1', 's5'], ['s2', 's4'], ['s1', 's3'], ['s2', 's6'],
+            ['s3', 's8'], ['s4', 's7'], ['s3', 's7'], ['s4', 's8'],
+            ['s5', 's9'], ['s6', 's10'], ['s5', 's10'], ['s6', 's9'],
+            # Switch-to-AP links
+            ['s7', 'ap1'], ['s8', 'ap2'], ['s9', 'ap3'], ['s10', 'ap4'],
+            ['ap5', 's7'], ['ap6', 's8'], ['ap7', 's9'], ['ap8', 's10'],
+            # Core network links with hosts
+            ['s0', 'h9'], ['h9', 's1'], ['s0', 's2'], ['s2', 'h10'], ['h10', 's4'],
+            # Host connections
+            ['s0', 'h0'], ['h8', 's3'], ['h1', 's7'], ['h5', 's4'], ['h2', 's8'],
+            ['h6', 's5'], ['h3', 's9'], ['s6', 'h7'], ['s10', 'h4'],
+        ],
+    }
+
+
+class _Builder:
+    """Helper that hands out sequential names, DPIDs and IPs while generating specs"""
+
+    def __init__(self, name, bw=100):
+        self.spec = {'name': name, 'link_defaults': {'bw': bw}, 'switches': [], 'aps': [],
+                     'stations': [], 'hosts': [], 'links': []}
+        self._next_dpid = 1
+        self._next_ip = 1
+
+    def _ip(self):
+        ip = self._next_ip
+        self._next_ip += 1
+        return f"10.{(ip >> 16) & 0xff}.{(ip >> 8) & 0xff}.{ip & 0xff}"
+
+    def switch(self, role=None):
+        name = f"s{len(self.spec['switches'])}"
+        self.spec['switches'].append({'name': name, 'dpid': _dpid(self._next_dpid), 'role': role})
+        self._next_dpid += 1
+        return name
+
+    def ap(self, x, y):
+        name = f"ap{len(self.spec['aps']) + 1}"
+        self.spec['aps'].append({'name': name, 'ssid': f'{name}-ssid', 'channel': '1', 'mode': 'g',
+                                 'position': f'{x:.1f},{y:.1f},0', 'dpid': _dpid(self._next_dpid)})
+        self._next_dpid += 1
+        return name
+
+    def station(self, x, y):
+        name = f"sta{len(self.spec['stations']) + 1}"
+        self.spec['stations'].append({'name': name, 'ip': self._ip(), 'position': f'{x:.1f},{y:.1f},0'})
+        return name
+
+    def host(self):
+        name = f"h{len(self.spec['hosts'])}"
+        self.spec['hosts'].append({'name': name, 'ip': self._ip()})
+        return name
+
+    def link(self, src, dst):
+        self.spec['links'].append([src, dst])
+
+
+def fat_tree(k=4, bw=100):
+    """k-ary fat-tree: (k/2)^2 core, k pods of k/2 aggregation + k/2 edge switches, k^3/4 hosts"""
+    if k % 2:
+        raise ValueError("fat-tree arity k must be even")
+    half = k // 2
+    b = _Builder(f'fat-tree-k{k}', bw)
+    core = [b.switch('core') for _ in range(half * half)]
+    for _ in range(k):
+        aggs = [b.switch('aggregation') for _ in range(half)]
+        edges = [b.switch('edge') for _ in range(half)]
+        for a, agg in enumerate(aggs):
+            for c in range(half):
+                b.link(core[a * half + c], agg)
+            for edge in edges:
+                b.link(agg, edge)
+        for edge in edges:
+            for _ in range(half):
+                b.link(edge, b.host())
+    return b.spec
+
+
+def leaf_spine(spines=2, leaves=4, hosts_per_leaf=2, bw=100):
+    """Two-tier Clos: every leaf connects to every spine"""
+    b = _Builder(f'leaf-spine-{spines}x{leaves}', bw)
+    spine_names = [b.switch('spine') for _ in range(spines)]
+    for _ in range(leaves):
+        leaf = b.switch('leaf')
+        for spine in spine_names:
+            b.link(spine, leaf)
+        for _ in range(hosts_per_leaf):
+            b.link(leaf, b.host())
+    return b.spec
+
+
+def ap_grid(rows=2, cols=4, stations=10, spacing=350.0, hosts=None, seed=None, bw=100):
+    """Grid of APs (one access switch per row under a core switch) with randomly placed stations"""
+    rng = random.Random(seed)
+    b = _Builder(f'ap-grid-{rows}x{cols}-{stations}sta', bw)
+    core = b.switch('core')
+    for r in range(rows):
+        access = b.switch('access')
+        b.link(core, access)
+        for c in range(cols):
+            b.link(access, b.ap(spacing * (c + 0.5), spacing * (r + 0.5)))
+    for _ in range(stations):
+        b.station(rng.uniform(0, spacing * cols), rng.uniform(0, spacing * rows))
+    for _ in range(hosts if hosts is not None else rows):
+        b.link(b.host(), core)
+    b.spec['propagation'] = {'model': 'logDistance', 'exp': 3}
+    b.spec['plot'] = {'max_x': spacing * cols, 'max_y': spacing * rows}
+    return b.spec
+
+
+GENERATORS = {'fat-tree': fat_tree, 'leaf-spine': leaf_spine, 'ap-grid': ap_grid}
+
+
+def load_spec(path=None):
+    """Load a spec from JSON or YAML; with no path return the default thesis topology"""
+    if not path:
+        return default_spec()
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required to read YAML topology specs (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def save_spec(spec, path):
+    with open(path, 'w') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            yaml.safe_dump(spec, f, sort_keys=False)
+        else:
+            json.dump(spec, f, indent=2)
+    return path
+
+
+def node_types(spec):
+    """Map node name -> 'switch' | 'ap' | 'station' | 'host'"""
+    return {node['name']: kind for section, kind in NODE_SECTIONS for node in spec.get(section, [])}
+
+
+def links(spec):
+    """Normalized links as dicts with src, dst and the default link options filled in"""
+    defaults = spec.get('link_defaults', {'bw': 100})
+    normalized = []
+    for link in spec.get('links', []):
+        if isinstance(link, dict):
+            normalized.append({**defaults, **link})
+        else:
+            normalized.append({**defaults, 'src': link[0], 'dst': link[1]})
+    return normalized
+
+
+def datapaths(spec):
+    """Names of all switches and APs, switches first"""
+    return [n['name'] for n in spec.get('switches', [])] + [n['name'] for n in spec.get('aps', [])]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate a topology spec")
+    parser.add_argument('kind', choices=['default'] + sorted(GENERATORS))
+    parser.add_argument('-o', '--output', default='topology_spec.json', help='Output .json/.yaml path')
+    parser.add_argument('--k', type=int, default=4, help='fat-tree arity')
+    parser.add_argument('--spines', type=int, default=2)
+    parser.add_argument('--leaves', type=int, default=4)
+    parser.add_argument('--hosts-per-leaf', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=2)
+    parser.add_argument('--cols', type=int, default=4)
+    parser.add_argument('--stations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.kind == 'default':
+        spec = default_spec()
+    elif args.kind == 'fat-tree':
+        spec = fat_tree(args.k)
+    elif args.kind == 'leaf-spine':
+        spec = leaf_spine(args.spines, args.leaves, args.hosts_per_leaf)
+    else:
+        spec = ap_grid(args.rows, args.cols, args.stations, seed=args.seed)
+
+    save_spec(spec, args.output)
+    counts = ", ".join(f"{len(spec.get(section, []))} {section}" for section, _ in NODE_SECTIONS)
+    print(f"Wrote {spec['name']} ({counts}, {len(spec['links'])} links) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
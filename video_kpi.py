@@ -0,0 +1,147 @@
+import time
+import threading
+import numpy as np
+from mininet.log import info, error
+
+# Column layout of NetDevSampler.samples; TIME is time.monotonic()
+TIME, RX_BYTES, RX_PACKETS, RX_ERRORS, RX_DROPPED, JITTER, LOSS_RATE = range(7)
+COLUMNS = ('time', 'rx_bytes', 'rx_packets', 'rx_errors', 'rx_dropped', 'jitter', 'packet_loss_rate')
+
+
+def parse_net_dev(lines, intf_name):
+    """Return (rx_bytes, rx_packets, rx_errors, rx_dropped) for intf_name from /proc/net/dev lines"""
+    prefix = f"{intf_name}:"
+    for line in lines:
+        line = line.strip()
+        if line.startswith(prefix):
+            fields = line[len(prefix):].split()
+            return int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3])
+    return None
+
+
+class NetDevSampler:
+    """High-rate sampler of one interface's kernel counters inside a node's namespace.
+
+    Keeps /proc/<pid>/net/dev open and re-reads it at rate_hz into a
+    preallocated array, updating loss and RFC 3550 jitter incrementally.
+    Jitter is estimated from the mean packet inter-arrival time of each
+    sampling interval, so it needs rate_hz well above the stream's burst rate
+    to be meaningful.
+    """
+
+    def __init__(self, node, intf_name, duration=60, rate_hz=20):
+        self.path = f"/proc/{node.pid}/net/dev"
+        self.intf_name = intf_name
+        self.duration = duration
+        self.period = 1.0 / rate_hz
+        self.samples = np.zeros((int(duration * rate_hz) + 1, len(COLUMNS)), dtype=np.float64)
+        self.count = 0
+        self.wall_offset = time.time() - time.monotonic()
+        self.jitter = 0.0
+        self.loss_rate = 0.0
+        self.first_packet_time = None
+        self._prev_interarrival = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(sample_row) after every stored sample"""
+        self._listeners.append(callback)
+
+    def _update(self, counters):
+        idx = self.count
+        row = self.samples[idx]
+        row[:RX_DROPPED + 1] = counters
+
+        base = self.samples[0]
+        packets = row[RX_PACKETS] - base[RX_PACKETS]
+        lost = (row[RX_ERRORS] - base[RX_ERRORS]) + (row[RX_DROPPED] - base[RX_DROPPED])
+        self.loss_rate = lost / max(packets, 1) * 100
+
+        if packets > 0 and self.first_packet_time is None:
+            self.first_packet_time = row[TIME]
+
+        if idx > 0:
+            prev = self.samples[idx - 1]
+            delta_packets = row[RX_PACKETS] - prev[RX_PACKETS]
+            if delta_packets > 0:
+                interarrival = (row[TIME] - prev[TIME]) / delta_packets
+                if self._prev_interarrival is not None:
+                    d = abs(interarrival - self._prev_interarrival)
+                    self.jitter += (d - self.jitter) / 16
+                self._prev_interarrival = interarrival
+
+        row[JITTER] = self.jitter
+        row[LOSS_RATE] = self.loss_rate
+        self.count += 1
+
+    def run(self):
+        try:
+            with open(self.path) as f:
+                next_tick = time.monotonic()
+                while self.count < len(self.samples) and not self._stop.is_set():
+                    f.seek(0)
+                    counters = parse_net_dev(f, self.intf_name)
+                    if counters is not None:
+                        self._update((time.monotonic(),) + counters)
+                        for callback in self._listeners:
+                            callback(self.samples[self.count - 1])
+                    next_tick += self.period
+                    self._stop.wait(max(0, next_tick - time.monotonic()))
+        except OSError as e:
+            error(f"[VIDEO] Cannot sample {self.path}: {e}\n")
+        info(f"[VIDEO] Sampler for {self.intf_name} stopped after {self.count} samples\n")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def data(self):
+        """Return the filled part of the sample array"""
+        return self.samples[:self.count]
+
+    def wall_time(self, monotonic_ts):
+        return monotonic_ts + self.wall_offset
+
+
+def rfc3550_jitter(times, packets):
+    """Vectorized RFC 3550 jitter over counter samples.
+
+    Uses the mean packet inter-arrival time of each interval that received
+    packets; equivalent to running J += (|D| - J) / 16 over those intervals.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    packets = np.asarray(packets, dtype=np.float64)
+    delta_packets = np.diff(packets)
+    active = delta_packets > 0
+    interarrival = np.diff(times)[active] / delta_packets[active]
+    d = np.abs(np.diff(interarrival))
+    if d.size == 0:
+        return 0.0
+    weights = (15 / 16) ** np.arange(d.size - 1, -1, -1) / 16
+    return float(np.dot(weights, d))
+
+
+def kpi_summary(samples):
+    """Loss, jitter and volume over a sample array laid out as NetDevSampler.samples"""
+    if len(samples) < 2:
+        return None
+    first, last = samples[0], samples[-1]
+    packets = last[RX_PACKETS] - first[RX_PACKETS]
+    lost = (last[RX_ERRORS] - first[RX_ERRORS]) + (last[RX_DROPPED] - first[RX_DROPPED])
+    receiving = np.nonzero(samples[:, RX_PACKETS] > first[RX_PACKETS])[0]
+    return {
+        'packets': int(packets),
+        'bytes': int(last[RX_BYTES] - first[RX_BYTES]),
+        'duration': float(last[TIME] - first[TIME]),
+        'packet_loss_rate': float(lost / max(packets, 1) * 100),
+        'rfc3550_jitter': rfc3550_jitter(samples[:, TIME], samples[:, RX_PACKETS]),
+        'first_packet_time': float(samples[receiving[0], TIME]) if receiving.size else None,
+    }
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Receiver-side per-packet probe for the VLC UDP stream.
+
+Runs inside a node's namespace, timestamps every UDP datagram sent to the
+video port on an AF_PACKET socket and prints one JSON line of KPIs per
+second (packets, bytes, loss, RFC 3550 jitter). State is O(1): only running
+counters are kept, never the packets themselves.
+
+RTP payloads use the RTP sequence number and timestamp; raw MPEG-TS (what
+`cvlc --sout '#udp{...}'` sends) uses TS continuity counters for loss and
+inter-arrival variation for jitter.
+"""
+import argparse
+import json
+import socket
+import struct
+import sys
+import time
+
+ETH_P_IP = 0x0800
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)
+RTP_CLOCK_RATE = 90000
+TS_PACKET_SIZE = 188
+
+
+class StreamStats:
+    """Incremental loss and RFC 3550 jitter for one UDP stream"""
+
+    def __init__(self):
+        self.packets = 0
+        self.units = 0
+        self.bytes = 0
+        self.lost = 0
+        self.jitter = 0.0
+        self.mode = None
+        self._prev_arrival = None
+        self._prev_transit = None
+        self._prev_iat = None
+        self._base_seq = None
+        self._max_seq = None
+        self._seq_cycles = 0
+        self._ts_cc = {}
+
+    def _rtp(self, payload, arrival):
+        seq, rtp_ts = struct.unpack_from('!HI', payload, 2)
+        if self._base_seq is None:
+            self._base_seq = self._max_seq = seq
+        elif seq < self._max_seq and self._max_seq - seq > 0x8000:
+            self._seq_cycles += 1 << 16
+            self._max_seq = seq
+        elif seq > self._max_seq:
+            self._max_seq = seq
+        expected = self._seq_cycles + self._max_seq - self._base_seq + 1
+        self.lost = max(0, expected - self.units)
+
+        transit = arrival - rtp_ts / RTP_CLOCK_RATE
+        if self._prev_transit is not None:
+            d = abs(transit - self._prev_transit)
+            self.jitter += (d - self.jitter) / 16
+        self._prev_transit = transit
+
+    def _mpeg_ts(self, payload):
+        for offset in range(0, len(payload) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+            if payload[offset] != 0x47:
+                continue
+            pid = ((payload[offset + 1] & 0x1F) << 8) | payload[offset + 2]
+            has_payload = payload[offset + 3] & 0x10
+            cc = payload[offset + 3] & 0x0F
+            if pid == 0x1FFF or not has_payload:
+                continue
+            self.units += 1
+            prev = self._ts_cc.get(pid)
+            if prev is not None and cc != prev:
+                self.lost += (cc - prev - 1) % 16
+            self._ts_cc[pid] = cc
+
+    def _interarrival(self, arrival):
+        if self._prev_arrival is not None:
+            iat = arrival - self._prev_arrival
+            if self._prev_iat is not None:
+                d = abs(iat - self._prev_iat)
+                self.jitter += (d - self.jitter) / 16
+            self._prev_iat = iat
+        self._prev_arrival = arrival
+
+    def add(self, payload, arrival):
+        self.packets += 1
+        self.bytes += len(payload)
+        if self.mode is None:
+            if payload[:1] == b'\x47':
+                self.mode = 'ts'
+            elif len(payload) >= 12 and payload[0] >> 6 == 2:
+                self.mode = 'rtp'
+            else:
+                self.mode = 'udp'
+
+        if self.mode != 'ts':
+            self.units += 1
+
+        if self.mode == 'rtp':
+            self._rtp(payload, arrival)
+        else:
+            if self.mode == 'ts':
+                self._mpeg_ts(payload)
+            self._interarrival(arrival)
+
+    def loss_percent(self):
+        """Loss in the stream's own units: TS packets for MPEG-TS, datagrams otherwise"""
+        return self.lost / max(self.units + self.lost, 1) * 100
+
+
+def udp_payload(frame, port):
+    """Return the UDP payload of an Ethernet/IPv4 frame addressed to port, else None"""
+    if len(frame) < 42 or frame[12:14] != b'\x08\x00':
+        return None
+    ihl = (frame[14] & 0x0F) * 4
+    if frame[23] != socket.IPPROTO_UDP:
+        return None
+    udp = 14 + ihl
+    dst_port, length = struct.unpack_from('!HH', frame, udp + 2)
+    if dst_port != port:
+        return None
+    return frame[udp + 8:udp + length]
+
+
+def open_socket(intf):
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_IP))
+    sock.bind((intf, 0))
+    sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+    sock.settimeout(0.2)
+    return sock
+
+
+def kernel_timestamp(ancdata):
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS and len(data) >= 16:
+            sec, nsec = struct.unpack('qq', data[:16])
+            return sec + nsec / 1e9
+    return time.time()
+
+
+def run(intf, port, duration, out=sys.stdout):
+    sock = open_socket(intf)
+    stats = StreamStats()
+    last = {'packets': 0, 'units': 0, 'bytes': 0, 'lost': 0}
+    end = time.monotonic() + duration if duration else None
+    next_report = time.monotonic() + 1
+
+    while end is None or time.monotonic() < end:
+        try:
+            frame, ancdata, _, _ = sock.recvmsg(65535, 64)
+            payload = udp_payload(frame, port)
+            if payload:
+                stats.add(payload, kernel_timestamp(ancdata))
+        except socket.timeout:
+            pass
+
+        if time.monotonic() >= next_report:
+            next_report += 1
+            packets = stats.packets - last['packets']
+            units = stats.units - last['units']
+            lost = stats.lost - last['lost']
+            out.write(json.dumps({
+                'time': time.time(),
+                'mode': stats.mode,
+                'packets': packets,
+                'bytes': stats.bytes - last['bytes'],
+                'lost': lost,
+                'loss_percent': lost / max(units + lost, 1) * 100,
+                'jitter_ms': stats.jitter * 1000,
+                'total_packets': stats.packets,
+                'total_loss_percent': stats.loss_percent(),
+            }) + "\n")
+            out.flush()
+            last = {'packets': stats.packets, 'units': stats.units, 'bytes': stats.bytes, 'lost': stats.lost}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-packet UDP/RTP jitter and loss probe")
+    parser.add_argument('--intf', default='h0-eth0', help='Interface to capture on')
+    parser.add_argument('--port', type=int, default=1234, help='UDP destination port of the stream')
+    parser.add_argument('--duration', type=int, default=60, help='Seconds to run (0 = until killed)')
+    args = parser.parse_args()
+    try:
+        run(args.intf, args.port, args.duration)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
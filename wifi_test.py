@@ -3,8 +3,14 @@ import time
 import threading
 from mininet.log import info, error
 from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
 import re
+import signal
+from subprocess import DEVNULL
+from cqi_tables import rssi_to_cqi
+from iperf_servers import wait_with_backoff, client_pattern
+from node_index import get_node_index
 
 def get_visible_aps(station):
     result = station.cmd(f'iw dev {station.name}-wlan0 scan')
@@ -40,14 +46,28 @@ def get_rssi(station, ap):
         info(f"No RSSI info found for {station.name}\n")
         return None
 
-def rssi_to_cqi(rssi):
-    thresholds = [(-100, 1), (-90, 3), (-80, 5), (-70, 7), (-60, 10), (-50, 12)]
-    for threshold, cqi in thresholds:
-        if rssi < threshold:
-            return cqi
-    return 15
+def estimate_and_select_ap(station, estimator, min_rssi_threshold=-90, verify_scan=False):
+    """Rank APs from the propagation model instead of an iw scan"""
+    available_aps = estimator.rank_aps(station, min_rssi_threshold)
+
+    for ap, rssi in available_aps:
+        info(f"{station.name} estimates {ap.name}: RSSI={rssi:.1f}, CQI={rssi_to_cqi(rssi)}\n")
+
+    if verify_scan:
+        estimator.verify_with_scan(station, get_visible_aps(station))
+
+    if not available_aps:
+        info(f"No suitable AP found for {station.name}\n")
+        return None, [], 1
+
+    best_ap, best_rssi = available_aps[0]
+    info(f"{station.name} selected {best_ap.name} with estimated RSSI {best_rssi:.1f} dBm\n")
+    return best_ap, available_aps, rssi_to_cqi(best_rssi)
+
+def scan_and_select_ap(station, ap_list, min_rssi_threshold=-90, estimator=None, verify_scan=False):
+    if estimator is not None:
+        return estimate_and_select_ap(station, estimator, min_rssi_threshold, verify_scan)
 
-def scan_and_select_ap(station, ap_list, min_rssi_threshold=-90):
     info(f"{station.name} scanning for visible APs...\n")
     
     scan_results = get_visible_aps(station)
@@ -104,34 +124,116 @@ def request_and_reserve_rbs(station, ap, required_rbs, duration_seconds, net):
         return False
 
 def is_iperf3_server_alive(station, server_ip, port=5201):
-    result = station.cmd(f'nc -zvw2 {server_ip} {port} 2>&1')
+    result = station.cmd(f'nc -zvw1 {server_ip} {port} 2>&1')
     return "succeeded" in result or "open" in result
 
-def run_iperf_test(station, server_ip, bandwidth_mbps, duration_seconds, protocol='tcp', port=5201):
-    info(f"Starting iperf test: {station.name} -> {server_ip} at {bandwidth_mbps} Mbps for {duration_seconds}s (port {port})\n")
+def wait_for_iperf3_server(station, server_ip, port=5201, readiness=None, timeout=10):
+    """Wait for the server's readiness event, then confirm it from the station with ms backoff"""
+    if readiness is not None and not readiness.wait(server_ip, port, timeout):
+        error(f"[!] iperf3 server at {server_ip}:{port} never reported ready\n")
+        return False
+
+    if not wait_with_backoff(lambda: is_iperf3_server_alive(station, server_ip, port), timeout=timeout):
+        error(f"[!] iperf3 server at {server_ip}:{port} not reachable from {station.name}\n")
+        return False
+    return True
+
+def interval_sample(event_data):
+    """Reduce an iperf3 interval event to a per-second throughput/loss/jitter sample.
+
+    Only the receiver reports UDP jitter and loss; on client-side samples they are None.
+    """
+    sum_stats = event_data.get('sum', {})
+    return {
+        'start': sum_stats.get('start', 0),
+        'end': sum_stats.get('end', 0),
+        'mbps': sum_stats.get('bits_per_second', 0) / 1e6,
+        'bytes': sum_stats.get('bytes', 0),
+        'jitter_ms': sum_stats.get('jitter_ms'),
+        'lost_packets': sum_stats.get('lost_packets'),
+        'loss_percent': sum_stats.get('lost_percent'),
+        'retransmits': sum_stats.get('retransmits'),
+    }
+
+def receiver_intervals(iperf_data):
+    """Server-side interval samples from --get-server-output, [] if the server report is missing"""
+    server = iperf_data.get('server_output_json') or iperf_data.get('end', {}).get('server_output_json') or {}
+    return [interval_sample(interval) for interval in server.get('intervals', [])]
+
+def stream_iperf_test(station, cmd, target_mbps=None, min_throughput_ratio=None,
+                      grace_seconds=5, window=3, on_interval=None):
+    """Run an iperf3 client with --json-stream and consume its interval events live.
+
+    When min_throughput_ratio is set, the client is stopped early once the mean
+    of the last `window` intervals (after `grace_seconds`) falls below
+    min_throughput_ratio * target_mbps.
+    """
+    run = {'start': {}, 'end': {}, 'intervals': [], 'terminated_early': False}
+    proc = station.popen(cmd.split(), stderr=DEVNULL)
 
     try:
-        ping_result = station.cmd(f'ping -c 1 {server_ip}')
-        if 'unreachable' in ping_result or '100% packet loss' in ping_result:
-            error(f" {station.name} cannot reach {server_ip}\n")
-            return None
+        for raw_line in iter(proc.stdout.readline, b''):
+            try:
+                message = json.loads(raw_line.decode(errors='replace'))
+            except ValueError:
+                continue
+
+            event, data = message.get('event'), message.get('data', {})
+            if event == 'start':
+                run['start'] = data
+            elif event == 'end':
+                run['end'] = data
+            elif event == 'server_output_json':
+                run['server_output_json'] = data
+            elif event == 'error':
+                error(f"[{station.name}] iperf3 error: {data}\n")
+            elif event == 'interval':
+                sample = interval_sample(data)
+                run['intervals'].append(sample)
+                if on_interval:
+                    on_interval(station, sample)
+
+                recent = run['intervals'][-window:]
+                if (min_throughput_ratio and target_mbps and not run['terminated_early']
+                        and sample['end'] >= grace_seconds and len(recent) == window):
+                    recent_mbps = sum(s['mbps'] for s in recent) / window
+                    if recent_mbps < min_throughput_ratio * target_mbps:
+                        info(f"[{station.name}] {recent_mbps:.1f} Mbps is below {min_throughput_ratio:.0%} "
+                             f"of the {target_mbps} Mbps target - stopping iperf3 early\n")
+                        run['terminated_early'] = True
+                        proc.send_signal(signal.SIGINT)
+    finally:
+        proc.wait()
 
-        for attempt in range(5):
-            if is_iperf3_server_alive(station, server_ip, port):
-                break
-            info(f"[{station.name}] Waiting for iperf3 server on port {port} (attempt {attempt+1}/5)\n")
-            time.sleep(2)
-        else:
-            error(f"[!] iperf3 server at {server_ip}:{port} not reachable from {station.name}\n")
+    return run
+
+def run_iperf_test(station, server_ip, bandwidth_mbps, duration_seconds, protocol='tcp', port=5201,
+                   timeout_seconds=None, readiness=None, stream=False, min_throughput_ratio=None,
+                   on_interval=None):
+    """Run an iperf3 client; returns the -J output, or the decoded event stream when stream=True"""
+    info(f"Starting iperf test: {station.name} -> {server_ip} at {bandwidth_mbps} Mbps for {duration_seconds}s (port {port})\n")
+
+    try:
+        if not wait_for_iperf3_server(station, server_ip, port, readiness):
             return None
 
+        output_flag = "--json-stream --forceflush" if stream else "-J"
         if protocol.lower() == 'tcp':
-            cmd = f"iperf3 -c {server_ip} -p {port} -t {duration_seconds} -J"
+            cmd = f"iperf3 -c {server_ip} -p {port} -t {duration_seconds} {output_flag}"
         else:
-            cmd = f"iperf3 -c {server_ip} -u -b {bandwidth_mbps}M -p {port} -t {duration_seconds} -J"
+            # Jitter and loss are measured by the server; ask for its report
+            cmd = (f"iperf3 -c {server_ip} -u -b {bandwidth_mbps}M -p {port} -t {duration_seconds} "
+                   f"--get-server-output {output_flag}")
+
+        if timeout_seconds:
+            cmd = f"timeout -s INT {int(timeout_seconds)} {cmd}"
 
         info(f" Executing: {cmd}\n")
-        result = station.cmd(cmd)
+        if stream:
+            result = stream_iperf_test(station, cmd, target_mbps=bandwidth_mbps,
+                                       min_throughput_ratio=min_throughput_ratio, on_interval=on_interval)
+        else:
+            result = station.cmd(cmd)
 
         info(f"iperf test completed for {station.name} on port {port}\n")
         return result
@@ -182,13 +284,34 @@ def release_resources(station, ap, net):
     except Exception as e:
         error(f"Error in resource cleanup: {e}\n")
 
+def summarize_intervals(intervals):
+    """Aggregate streamed interval samples when iperf3 was stopped before its end event.
+
+    Jitter and loss stay None unless the samples come from the receiver.
+    """
+    seconds = sum(s['end'] - s['start'] for s in intervals)
+    total_bytes = sum(s['bytes'] for s in intervals)
+    jitters = [s['jitter_ms'] for s in intervals if s['jitter_ms'] is not None]
+    lost = [s['lost_packets'] for s in intervals if s['lost_packets'] is not None]
+    return {
+        'bytes': total_bytes,
+        'bits_per_second': total_bytes * 8 / seconds if seconds > 0 else 0,
+        'jitter_ms': jitters[-1] if jitters else None,
+        'lost_packets': sum(lost) if lost else None,
+    }
+
 def parse_iperf_result(iperf_result, protocol):
     if not iperf_result:
         return {}, 0
     
     try:
-        iperf_data = json.loads(iperf_result)
+        iperf_data = iperf_result if isinstance(iperf_result, dict) else json.loads(iperf_result)
         iperf_end = iperf_data.get('end', {})
+        received = receiver_intervals(iperf_data)
+
+        if not iperf_end and iperf_data.get('intervals'):
+            partial = summarize_intervals(received or iperf_data['intervals'])
+            iperf_end = {'sum': partial, 'sum_sent': partial}
 
         if protocol == 'tcp':
             sum_stats = iperf_end.get('sum_received') or iperf_end.get('sum', {})
@@ -205,20 +328,28 @@ def parse_iperf_result(iperf_result, protocol):
                 'tx_bytes': iperf_data.get('start', {}).get('connected', [{}])[0].get('bytes', 0),
                 'rx_bytes': sum_stats.get('bytes', 0),
                 'rx_mbps': sum_stats.get('bits_per_second', 0) / 1e6,
-                'jitter_ms': sum_stats.get('jitter_ms', 0),
-                'lost_packets': sum_stats.get('lost_packets', 0),
-                'total_packets': sum_stats.get('packets', 0),
-                'loss_percent': sum_stats.get('lost_percent', 0),
+                # None, not 0, when no receiver report arrived: unknown is not lossless
+                'jitter_ms': sum_stats.get('jitter_ms'),
+                'lost_packets': sum_stats.get('lost_packets'),
+                'total_packets': sum_stats.get('packets'),
+                'loss_percent': sum_stats.get('lost_percent'),
             }
             avg_mbps = result_summary['rx_mbps']
+        if 'intervals' in iperf_data:
+            result_summary['intervals'] = iperf_data['intervals']
+            result_summary['terminated_early'] = iperf_data.get('terminated_early', False)
+        if received:
+            result_summary['receiver_intervals'] = received
         return result_summary, avg_mbps
     except Exception as e:
-        print(f"[!] iperf3 RAW output: {iperf_result[:300]}")
+        print(f"[!] iperf3 RAW output: {str(iperf_result)[:300]}")
         error(f"[!] Failed to parse iperf3 JSON: {e}\n")
         return {}, 0
 
 def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
-                          duration_seconds=60, protocol='tcp', port=5201):
+                          duration_seconds=60, protocol='tcp', port=5201,
+                          estimator=None, verify_scan=False, timeout_seconds=None, readiness=None,
+                          stream=False, min_throughput_ratio=None, on_interval=None, path_engine=None):
     info(f"Starting WiFi resource management for {station.name}\n")
     info(f"   Target: {server_ip}, Bandwidth: {bandwidth_mbps} Mbps, Duration: {duration_seconds}s, Port: {port}\n")
 
@@ -227,13 +358,19 @@ def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
     if not all([station, net, ap_list]):
         return {'success': False, 'error': 'Invalid inputs'}
 
-    selected_ap, available_aps, _ = scan_and_select_ap(station, ap_list)
+    selected_ap, available_aps, _ = scan_and_select_ap(station, ap_list, estimator=estimator,
+                                                       verify_scan=verify_scan)
 
     if not available_aps:
         return {'success': False, 'error': 'No suitable AP found'}
 
     available_aps.sort(key=lambda x: x[1], reverse=True)
 
+    # With a path engine, an AP is only used if its wired path to the server can carry the request
+    server_name = get_node_index(net).name_for_ip(server_ip) if path_engine is not None else None
+    backhaul_path = None
+    backhaul_rejected = 0
+
     for ap, rssi in available_aps:
         cqi = rssi_to_cqi(rssi)
         required_rbs = ap.estimate_required_rbs(bandwidth_mbps, cqi_level=cqi)
@@ -242,7 +379,29 @@ def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
 
         info(f"Trying AP {ap.name} (RSSI: {rssi}, CQI: {cqi}) with {required_rbs} required RBs\n")
 
+        if server_name:
+            backhaul_path = path_engine.reserve(ap.name, server_name, bandwidth_mbps)
+            if backhaul_path is None:
+                backhaul_mbps = path_engine.capacity(ap.name, server_name)
+                info(f"Skipping AP {ap.name}: only {backhaul_mbps:.1f} Mbps left towards {server_name}\n")
+                backhaul_rejected += 1
+                allocation_attempts.append({
+                    'ap_name': ap.name,
+                    'rssi': rssi,
+                    'cqi': cqi,
+                    'required_rbs': required_rbs,
+                    'available_rbs_before': initial_available_rbs,
+                    'total_rbs': initial_total_rbs,
+                    'backhaul_mbps': backhaul_mbps,
+                    'success': False
+                })
+                selected_ap = None
+                continue
+
         success = request_and_reserve_rbs(station, ap, required_rbs, duration_seconds, net)
+        if not success and backhaul_path:
+            path_engine.release(backhaul_path, bandwidth_mbps)
+            backhaul_path = None
 
         allocation_attempts.append({
             'ap_name': ap.name,
@@ -265,7 +424,8 @@ def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
     if not selected_ap:
         return {
             'success': False,
-            'error': 'RB reservation failed on all available APs',
+            'error': ('Backhaul capacity exhausted from all available APs'
+                      if backhaul_rejected == len(available_aps) else 'RB reservation failed on all available APs'),
             'available_aps': [(ap.name, rssi) for ap, rssi in available_aps],
             'bandwidth_mbps': bandwidth_mbps,
             'duration_seconds': duration_seconds,
@@ -275,9 +435,10 @@ def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
         }
 
     try:
-        time.sleep(1)
-        iperf_result = run_iperf_test(station, server_ip, bandwidth_mbps, duration_seconds, protocol, port)
-        time.sleep(1)
+        iperf_result = run_iperf_test(station, server_ip, bandwidth_mbps, duration_seconds, protocol, port,
+                                      timeout_seconds=timeout_seconds, readiness=readiness,
+                                      stream=stream, min_throughput_ratio=min_throughput_ratio,
+                                      on_interval=on_interval)
 
         result_summary, avg_mbps = parse_iperf_result(iperf_result, protocol)
 
@@ -299,6 +460,7 @@ def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
             'port_used': port,
             'station': station.name,
             'estimated_cqi': estimated_cqi,
+            'backhaul_path': backhaul_path,
             'allocation_attempts': allocation_attempts
         }
 
@@ -307,8 +469,10 @@ def wifi_resource_manager(station, server_ip, bandwidth_mbps, ap_list, net,
 
     finally:
         release_resources(station, selected_ap, net)
+        if backhaul_path:
+            path_engine.release(backhaul_path, bandwidth_mbps)
 
-def setup_iperf_servers(test_scenarios):
+def setup_iperf_servers(test_scenarios, net=None):
     unique_servers = {}
     
     for idx, scenario in enumerate(test_scenarios):
@@ -318,49 +482,120 @@ def setup_iperf_servers(test_scenarios):
         if server_ip not in unique_servers:
             unique_servers[server_ip] = []
         unique_servers[server_ip].append(port)
-    
-    info(f"[SETUP] Need iperf3 servers: {unique_servers}\n")
+
+    if net is not None:
+        node_index = get_node_index(net)
+        named = {f"{node_index.name_for_ip(ip) or '?'}({ip})": ports for ip, ports in unique_servers.items()}
+        info(f"[SETUP] Need iperf3 servers: {named}\n")
+    else:
+        info(f"[SETUP] Need iperf3 servers: {unique_servers}\n")
     return unique_servers
 
-def run_concurrent_tests(test_scenarios, aps, net):
-    threads = []
-    results = [None] * len(test_scenarios)  
-    
-    setup_iperf_servers(test_scenarios)
+def kill_iperf_client(station, server_ip, port):
+    """Stop a running iperf3 client without going through the station's busy shell"""
+    try:
+        station.popen(['pkill', '-INT', '-f', client_pattern(server_ip, port)]).wait()
+    except Exception as e:
+        error(f"Error stopping iperf3 client on {station.name}: {e}\n")
 
-    def run_test(scenario, index):
-        station = scenario['station']
-        server_ip = scenario['server_ip']
-        bandwidth_mbps = scenario['bandwidth_mbps']
-        duration_seconds = scenario['duration_seconds']
-        protocol = scenario['protocol']
+def iter_concurrent_tests(test_scenarios, aps, net, max_workers=8, deadline_slack=30, estimator=None,
+                          readiness=None, on_interval=None, path_engine=None, verify_scan=False):
+    """Run scenarios on a bounded worker pool and yield (index, result) as each one finishes.
 
-        port = scenario.get('port', 5201 + index)  
-        
-        info(f"[CONCURRENT] Starting test {index}: {station.name} -> {server_ip}:{port}\n")
+    Each scenario gets a deadline of duration_seconds + deadline_slack (or its own
+    'deadline_seconds'), counted from when a worker picks it up. Overdue scenarios
+    have their iperf3 client stopped; they are reported as timed out once their
+    worker has returned and released its RBs, with the usual result keys.
+    """
+    setup_iperf_servers(test_scenarios, net)
 
-        result = wifi_resource_manager(
-            station, server_ip, bandwidth_mbps, aps, net,
-            duration_seconds=duration_seconds,
-            protocol=protocol,
-            port=port
+    started = {}
+    overdue = set()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wifi-test')
+
+    def deadline_of(scenario):
+        return scenario.get('deadline_seconds', scenario['duration_seconds'] + deadline_slack)
+
+    def run_test(scenario, index, port):
+        started[index] = time.monotonic()
+        station = scenario['station']
+        info(f"[CONCURRENT] Starting test {index}: {station.name} -> {scenario['server_ip']}:{port}\n")
+
+        return wifi_resource_manager(
+            station, scenario['server_ip'], scenario['bandwidth_mbps'], aps, net,
+            duration_seconds=scenario['duration_seconds'],
+            protocol=scenario['protocol'],
+            port=port,
+            estimator=estimator,
+            verify_scan=verify_scan,
+            timeout_seconds=deadline_of(scenario),
+            readiness=readiness,
+            stream=scenario.get('stream', False),
+            min_throughput_ratio=scenario.get('min_throughput_ratio'),
+            on_interval=on_interval,
+            path_engine=path_engine
         )
-        
-        results[index] = result
-        info(f"[CONCURRENT] Completed test {index}: {station.name} (success: {result.get('success', False)})\n")
 
-    for idx, scenario in enumerate(test_scenarios):
-        t = Thread(target=run_test, args=(scenario, idx))
-        threads.append(t)
-        t.start()
-        time.sleep(0.5)
+    ports = [scenario.get('port', 5201 + idx) for idx, scenario in enumerate(test_scenarios)]
+    futures = {executor.submit(run_test, scenario, idx, ports[idx]): idx
+               for idx, scenario in enumerate(test_scenarios)}
+
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                idx = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'success': False, 'error': f'{type(e).__name__}: {e}',
+                              'station': test_scenarios[idx]['station'].name}
+                if idx in overdue:
+                    result = dict(result, success=False, error='Deadline exceeded', port_used=ports[idx])
+                info(f"[CONCURRENT] Completed test {idx}: {result.get('station')} "
+                     f"(success: {result.get('success', False)})\n")
+                yield idx, result
+
+            now = time.monotonic()
+            for future in list(pending):
+                idx = futures[future]
+                scenario = test_scenarios[idx]
+                if idx in started and now - started[idx] > deadline_of(scenario):
+                    if idx not in overdue:
+                        error(f"[CONCURRENT] Test {idx} exceeded its {deadline_of(scenario)}s deadline\n")
+                        overdue.add(idx)
+                    # Keep stopping the client until the worker returns; it may start iperf3 late
+                    kill_iperf_client(scenario['station'], scenario['server_ip'], ports[idx])
+
+    except KeyboardInterrupt:
+        error("[CONCURRENT] Interrupted - cancelling queued tests and stopping iperf3 clients\n")
+        for future in pending:
+            future.cancel()
+        for idx in started:
+            scenario = test_scenarios[idx]
+            kill_iperf_client(scenario['station'], scenario['server_ip'], ports[idx])
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def run_concurrent_tests(test_scenarios, aps, net, estimator=None, max_workers=8, on_result=None,
+                         readiness=None, on_interval=None, path_engine=None, verify_scan=False):
+    """Run scenarios concurrently and return their results in scenario order"""
+    results = [None] * len(test_scenarios)
 
-    for t in threads:
-        t.join()
+    for idx, result in iter_concurrent_tests(test_scenarios, aps, net, max_workers=max_workers,
+                                             estimator=estimator, readiness=readiness,
+                                             on_interval=on_interval, path_engine=path_engine,
+                                             verify_scan=verify_scan):
+        results[idx] = result
+        if on_result:
+            on_result(idx, result)
 
-    return [r for r in results if r is not None] 
+    return [r for r in results if r is not None]
 
-def run_sequential_tests_with_sharing(test_scenarios, aps, net):
+def run_sequential_tests_with_sharing(test_scenarios, aps, net, estimator=None, readiness=None, path_engine=None):
     results = []
     
     for idx, scenario in enumerate(test_scenarios):
@@ -374,7 +609,10 @@ def run_sequential_tests_with_sharing(test_scenarios, aps, net):
             net,
             duration_seconds=scenario['duration_seconds'],
             protocol=scenario['protocol'],
-            port=scenario.get('port', 5201)
+            port=scenario.get('port', 5201),
+            estimator=estimator,
+            readiness=readiness,
+            path_engine=path_engine
         )
         
         results.append(result)